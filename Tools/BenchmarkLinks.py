@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import psutil
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+from pathlib import Path
+from datetime import datetime, timezone
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "Tools"))
+sys.path.insert(0, str(ROOT / "update" / "auto"))
+
+def payload(name, size):
+    """Deterministic body of a synthetic installer"""
+    block = hashlib.sha256(name.encode()).digest() * 2048
+    full, rest = divmod(size, len(block))
+    for _ in range(full):
+        yield block
+    if rest:
+        yield block[:rest]
+
+def payload_hash(name, size):
+    sha256 = hashlib.sha256()
+    for chunk in payload(name, size):
+        sha256.update(chunk)
+    return sha256.hexdigest().upper()
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves /<name>?size=&latency=&status=&redirect=&hang=&etag= as described by the query"""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def respond(self, body=True):
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        time.sleep(float(query.get("latency", 0)) / 1000)
+        if query.get("hang"):
+            time.sleep(float(query["hang"]))
+        redirect = int(query.get("redirect", 0))
+        if redirect:
+            query["redirect"] = redirect - 1
+            self.send_response(302)
+            self.send_header("Location", f"{url.path}?{'&'.join(f'{k}={v}' for k, v in query.items())}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        status = int(query.get("status", 200))
+        size = int(query.get("size", 0)) if status == 200 else 0
+        etag = f'"{hashlib.md5(f"{url.path}:{size}".encode()).hexdigest()}"'
+        if query.get("etag") and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(status)
+        self.send_header("Content-Length", str(size))
+        if query.get("etag"):
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", "Mon, 01 Jun 2026 00:00:00 GMT")
+        self.end_headers()
+        if body:
+            for chunk in payload(url.path, size):
+                self.wfile.write(chunk)
+
+    def do_GET(self):
+        self.respond()
+
+    def do_HEAD(self):
+        self.respond(body=False)
+
+def serve():
+    """Run the stand-in server in this process, announcing its port on stdout"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    # Clients dropping connections (timeouts, mismatches) are expected
+    server.handle_error = lambda request, client_address: None
+    print(server.server_address[1], flush=True)
+    server.serve_forever()
+
+def start_server():
+    """Stand-in server in a child process, so it shares neither the GIL, CPU time nor memory with what is measured"""
+    process = subprocess.Popen([sys.executable, __file__, "--serve"], stdout=subprocess.PIPE, text=True)
+    port = process.stdout.readline().strip()
+    if not port:
+        process.kill()
+        raise RuntimeError("Stand-in server did not start")
+    return process, int(port)
+
+def generate_tree(root, port, args):
+    """Write a synthetic manifests tree whose URLs point at the stand-in server"""
+    rng = random.Random(args.seed)
+    hosts = [f"127.0.0.1:{port}", f"localhost:{port}"]
+    folder = root / "manifests" / "b" / "Bench"
+    urls = 0
+    for n in range(args.packages):
+        version_folder = folder / f"Pkg{n}" / "1.0"
+        version_folder.mkdir(parents=True, exist_ok=True)
+        package_id = f"Bench.Pkg{n}"
+        lines = [
+            f"PackageIdentifier: {package_id}",
+            'PackageVersion: "1.0"',
+            "InstallerType: zip",
+            "Installers:",
+        ]
+        for arch in ("x86", "x64"):
+            path = f"/{package_id}-{arch}.zip"
+            size = rng.randint(args.min_size, args.max_size)
+            query = {"size": size, "latency": args.latency}
+            roll = rng.random()
+            if roll < args.error_ratio:
+                query["status"] = rng.choice((404, 500, 503))
+            elif roll < args.error_ratio + args.timeout_ratio:
+                query["hang"] = 15
+            if rng.random() < args.redirect_ratio:
+                query["redirect"] = rng.randint(1, 3)
+            if rng.random() < args.etag_ratio:
+                query["etag"] = 1
+            expected = payload_hash(path, size)
+            if rng.random() < args.mismatch_ratio:
+                expected = "F" * 64
+            url = f"http://{rng.choice(hosts)}{path}?{'&'.join(f'{k}={v}' for k, v in query.items())}"
+            lines += [
+                f"- Architecture: {arch}",
+                f"  InstallerUrl: {url}",
+                f"  InstallerSha256: {expected}",
+            ]
+            urls += 1
+        lines += ["ManifestType: installer", "ManifestVersion: 1.12.0"]
+        (version_folder / f"{package_id}.installer.yaml").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        (version_folder / f"{package_id}.locale.en-US.yaml").write_text(
+            f"PackageIdentifier: {package_id}\n"
+            'PackageVersion: "1.0"\n'
+            f"PackageUrl: http://{rng.choice(hosts)}/{package_id}.html?size=2048&latency={args.latency}\n"
+            "ManifestType: defaultLocale\n",
+            encoding="utf-8",
+        )
+        urls += 1
+    return folder, urls
+
+class PeakRss:
+    """Samples resident memory of this process on a background thread"""
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.process = psutil.Process()
+        self.peak = 0
+        self.stop = threading.Event()
+
+    def sample(self):
+        while not self.stop.is_set():
+            self.peak = max(self.peak, self.process.memory_info().rss)
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.peak = self.process.memory_info().rss
+        self.thread = threading.Thread(target=self.sample, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        self.thread.join()
+
+def measure(name, fn, urls):
+    """Run fn once, returning wall time, CPU time, throughput and peak RSS"""
+    print(f"Running {name}...", file=sys.stderr)
+    process = psutil.Process()
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            with PeakRss() as rss:
+                cpu = sum(process.cpu_times()[:2])
+                start = time.perf_counter()
+                fn()
+                wall = time.perf_counter() - start
+                cpu = sum(process.cpu_times()[:2]) - cpu
+        finally:
+            sys.stdout = stdout
+    return {
+        "wall_s": round(wall, 3),
+        "cpu_s": round(cpu, 3),
+        "urls": urls,
+        "urls_per_s": round(urls / wall, 2) if wall else None,
+        "peak_rss_mb": round(rss.peak / (1 << 20), 1),
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(old, new):
+    """Print relative change of every metric between two result files"""
+    print(f"{'benchmark':<20} {'metric':<12} {old.get('commit')!s:>12} {new.get('commit')!s:>12} {'change':>8}")
+    for name, metrics in new["results"].items():
+        for metric, value in metrics.items():
+            before = old["results"].get(name, {}).get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(before, (int, float)) or metric == "urls":
+                continue
+            change = f"{(value - before) / before * 100:+.1f}%" if before else "n/a"
+            print(f"{name:<20} {metric:<12} {before:>12} {value:>12} {change:>8}")
+
+def main(args):
+    if args.serve:
+        return serve()
+    work = Path(tempfile.mkdtemp(prefix="bench_links_"))
+    os.environ.setdefault("MANIFEST_INDEX", str(work / "manifests.db"))
+    os.environ.setdefault("INSTALLER_STORE", str(work / "installers"))
+    os.environ["LINKS_CACHE"] = str(work / "links.json")
+    if not args.with_cache:
+        os.environ["NO_CACHE"] = str(True)
+
+    import TestLinks
+    import _update_all
+
+    server, port = start_server()
+    folder, urls = generate_tree(work, port, args)
+    print(f"Generated {args.packages} packages ({urls} URLs) under {work}", file=sys.stderr)
+
+    cwd = os.getcwd()
+    os.chdir(work)
+    try:
+        folder = folder.relative_to(work)
+        results = {
+            "check_links": measure("TestLinks.check_links", lambda: list(TestLinks.check_links([str(folder)])), urls),
+            "check_mismatches": measure("_update_all.check_mismatches", lambda: _update_all.check_mismatches(folder), args.packages * 2),
+            # End to end, with the result printing and summary
+            "main": measure("TestLinks.main", lambda: TestLinks.main([str(folder)]), urls),
+        }
+    finally:
+        os.chdir(cwd)
+        server.terminate()
+        server.wait()
+        if not args.keep:
+            shutil.rmtree(work, ignore_errors=True)
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "platform": sys.platform,
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare", "keep", "serve")},
+        "env": {k: os.environ[k] for k in ("LINKS_JOBS", "LINKS_PER_HOST") if k in os.environ},
+        "results": results,
+    }
+    output = Path(args.output or Path(__file__).parent / ".cache" / "bench" / f"links_{report['commit'] or 'local'}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(report, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text(encoding="utf-8")), report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark TestLinks and check_mismatches against a local stand-in server")
+    parser.add_argument("--packages", type=int, default=200, help="number of synthetic packages (3 URLs each)")
+    parser.add_argument("--latency", type=int, default=50, help="server latency per request in ms")
+    parser.add_argument("--min-size", type=int, default=64 << 10, help="smallest installer in bytes")
+    parser.add_argument("--max-size", type=int, default=4 << 20, help="largest installer in bytes")
+    parser.add_argument("--error-ratio", type=float, default=0.05, help="share of installers answering 4xx/5xx")
+    parser.add_argument("--timeout-ratio", type=float, default=0.0, help="share of installers that hang past the read timeout")
+    parser.add_argument("--redirect-ratio", type=float, default=0.2, help="share of installers behind 1-3 redirects")
+    parser.add_argument("--etag-ratio", type=float, default=0.5, help="share of installers served with ETag/Last-Modified")
+    parser.add_argument("--mismatch-ratio", type=float, default=0.05, help="share of installers with a wrong hash in the manifest")
+    parser.add_argument("--with-cache", action="store_true", help="keep the TestLinks validation cache enabled")
+    parser.add_argument("--keep", action="store_true", help="keep the generated tree and caches")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    main(parser.parse_args())
@@ -0,0 +1,164 @@
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import importlib.util
+from pathlib import Path
+from bs4 import BeautifulSoup
+
+ROOT = Path(__file__).resolve().parents[1]
+PAGES_DIR = Path(__file__).parent / ".cache" / "nirsoft_pages"
+sys.path.insert(0, str(ROOT / "Tools"))
+
+import HttpClient
+
+def load_releasenotes():
+    path = ROOT / "update" / "releasenotes" / "releasenotes_nirsoft_update.py"
+    spec = importlib.util.spec_from_file_location(path.stem, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def soup_history(text):
+    """Reference extractor: full BeautifulSoup tree, as the release notes script used to do it"""
+    soup = BeautifulSoup(text, "lxml")
+    heading = soup.find(
+        "h4",
+        class_="utilsubject",
+        string=lambda text: text and text.strip() == "Versions History"
+    )
+    if heading is None:
+        raise RuntimeError("Versions History section was not found.")
+    history = heading.find_next("ul")
+    if history is None:
+        raise RuntimeError("Versions History list was not found.")
+    records = []
+    for entry in history.find_all("li", recursive=False):
+        label = next((text.strip() for text in entry.find_all(string=True, recursive=False)), "")
+        notes = entry.find("ul", recursive=False)
+        if notes is not None:
+            notes = [re.sub(r"\s+", " ", note.get_text(" ", strip=True)) for note in notes.find_all("li", recursive=False)]
+        records.append((re.sub(r"^Version\s+", "", label).rstrip(":"), notes))
+    return records
+
+def synthetic_page(rng, name):
+    """A product page laid out like NirSoft's, with the markup variations the extractor has to cope with"""
+    filler = "".join(
+        f"<p>Paragraph {i} about {name} with <a href='x{i}.html'>links</a> and <b>bold</b> text, lorem ipsum dolor sit amet.</p>\n"
+        for i in range(rng.randint(50, 300))
+    )
+    entries = []
+    for k in range(rng.randint(5, 40)):
+        version = f"1.{60 - k}"
+        roll = rng.random()
+        if roll < 0.1:
+            # Only the label, no notes list
+            entries.append(f"<li>Version {version}:</li>")
+            continue
+        notes = []
+        for j in range(rng.randint(1, 5)):
+            note = rng.choice((
+                f"Fixed   bug {j} in\n <b>{name}</b> for version {version}.",
+                f"Added <a href='faq.html#{j}'>command-line option</a> /opt{j}.",
+                f"Added support for <i>Windows 11</i> (<font color=red>beta</font>).",
+                f"Updated the <a href='https://example.com/{j}'>translation</a>  files.",
+            ))
+            notes.append(f"<li>{note}</li>")
+        tag = "UL" if roll < 0.2 else "ul"
+        entries.append(f"<li>Version {version}:\n<{tag}>{''.join(notes)}</{tag}></li>")
+    heading = rng.choice((
+        '<h4 class="utilsubject">Versions History</h4>',
+        '<h4 class="utilsubject">  Versions History </h4>',
+        '<H4 CLASS="utilsubject" id="history">Versions History</H4>',
+    ))
+    return f"""<html><head><title>{name}</title></head><body><table><tr><td>
+<h4 class="utilsubject">Description</h4>{filler}
+{heading}
+<ul>
+{chr(10).join(entries)}
+</ul>
+<h4 class="utilsubject">System Requirements</h4>{filler}
+</td></tr></table></body></html>"""
+
+def synthetic_pages(count=120, seed=0):
+    """Deterministic stand-in for the saved product pages, so the benchmark runs offline"""
+    rng = random.Random(seed)
+    pages = {f"tool{n}.html": synthetic_page(rng, f"Tool{n}") for n in range(count)}
+    # A page without the section must fail the same way in both extractors
+    pages["no_history.html"] = "<html><body><h4 class='utilsubject'>Description</h4><p>Nothing here.</p></body></html>"
+    return pages
+
+def save_pages(pages_dir):
+    """Download the product page of every NirSoft package in manifests"""
+    pages_dir.mkdir(parents=True, exist_ok=True)
+    urls = set()
+    for path in (ROOT / "manifests" / "n" / "NirSoft").rglob("*.locale.en-US.yaml"):
+        match = re.search(r"^PackageUrl:\s*(\S+)", path.read_text(encoding="utf-8"), re.MULTILINE)
+        if match:
+            urls.add(match.group(1))
+    for url in sorted(urls):
+        name = url.rstrip("/").rsplit("/", 1)[-1]
+        response = HttpClient.get(url, timeout=30)
+        if not response.ok:
+            print(f"Skipping {url}: {response.status_code}", file=sys.stderr)
+            continue
+        (pages_dir / name).write_text(response.text, encoding="utf-8")
+    print(f"Saved {len(urls)} pages to {pages_dir}", file=sys.stderr)
+
+def measure(extract, pages, repeat):
+    """Best of repeat passes over all pages, returns (seconds, records per page)"""
+    best = None
+    for _ in range(repeat):
+        records = {}
+        start = time.perf_counter()
+        for name, text in pages.items():
+            try:
+                records[name] = extract(text)
+            except RuntimeError as e:
+                records[name] = str(e)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, records
+
+def main(args):
+    if args.pages or args.save:
+        pages_dir = Path(args.pages or PAGES_DIR)
+        if args.save:
+            save_pages(pages_dir)
+        pages = {path.name: path.read_text(encoding="utf-8", errors="replace") for path in sorted(pages_dir.glob("*.htm*"))}
+        if not pages:
+            sys.exit(f"No saved pages in {pages_dir}, run with --save first")
+    else:
+        pages = synthetic_pages(args.synthetic, args.seed)
+
+    releasenotes = load_releasenotes()
+    soup_time, soup_records = measure(soup_history, pages, args.repeat)
+    lxml_time, lxml_records = measure(releasenotes.parse_history, pages, args.repeat)
+    differ = sorted(name for name in pages if soup_records[name] != lxml_records[name])
+
+    report = {
+        "pages": len(pages),
+        "bytes": sum(len(text) for text in pages.values()),
+        "soup_ms_per_page": round(soup_time / len(pages) * 1000, 3),
+        "lxml_ms_per_page": round(lxml_time / len(pages) * 1000, 3),
+        "speedup": round(soup_time / lxml_time, 1) if lxml_time else None,
+        "differ": differ,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if differ:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the NirSoft Versions History extractor against a full BeautifulSoup parse")
+    parser.add_argument("--pages", help=f"folder of saved product pages instead of synthetic ones ({PAGES_DIR} with --save)")
+    parser.add_argument("--save", action="store_true", help="download the product pages of every NirSoft package first")
+    parser.add_argument("--synthetic", type=int, default=120, help="number of synthetic pages when no saved pages are used")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the pages, the best one counts")
+    parser.add_argument("--output", help="where to write the JSON results")
+    main(parser.parse_args())
@@ -0,0 +1,210 @@
+import os
+import re
+import sys
+import json
+import requests
+import threading
+from pathlib import Path
+from functools import lru_cache
+
+import HttpClient
+
+CACHE_FILE = Path(__file__).parent / ".cache" / "releases.json"
+MAX_PAGES = 10
+PER_PAGE = 100
+DOWNLOAD_PATTERN = re.compile(r"^https://github\.com/([^/]+)/([^/]+)/releases/download/([^/]+)/([^/?#]+)$")
+CHECKSUM_FILES = ("SHASUMS256.txt", "checksums.txt", "sha256sums.txt")
+CHECKSUM_PATTERN = re.compile(r"^([0-9a-fA-F]{64})\s+\*?(\S+)\s*$", re.MULTILINE)
+MAX_NOTES_LENGTH = 10000
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def token():
+    return os.getenv("GH_TOKEN") or os.getenv("GITHUB_TOKEN")
+
+def headers():
+    result = {"Accept": "application/vnd.github+json", "X-GitHub-Api-Version": "2022-11-28"}
+    if token():
+        result["Authorization"] = f"Bearer {token()}"
+    return result
+
+def cache_path():
+    return Path(os.getenv("RELEASES_CACHE", CACHE_FILE))
+
+def load_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = json.loads(cache_path().read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                _cache = {}
+        return _cache
+
+def save_cache():
+    """Write the cache back atomically, several updaters may share it"""
+    with _cache_lock:
+        if _cache is None:
+            return
+        path = cache_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(json.dumps(_cache), encoding="utf-8")
+        os.replace(tmp_path, path)
+
+def to_release(release):
+    """Keep what the updaters use of a release: its version and asset metadata"""
+    return {
+        "version": release["tag_name"].removeprefix("v"),
+        "tag": release["tag_name"],
+        "draft": release["draft"],
+        "prerelease": release["prerelease"],
+        "published": release.get("published_at"),
+        "html_url": release.get("html_url"),
+        "body": release.get("body") or "",
+        "assets": [
+            {
+                "name": asset["name"],
+                "url": asset["browser_download_url"],
+                "size": asset["size"],
+                "digest": asset.get("digest"),
+            }
+            for asset in release.get("assets", [])
+        ],
+    }
+
+def fetch_page(url):
+    """One page of releases, revalidated with the cached ETag; returns (releases, next page url)"""
+    cache = load_cache()
+    with _cache_lock:
+        entry = cache.get(url)
+    request_headers = headers()
+    if entry and entry.get("etag"):
+        request_headers["If-None-Match"] = entry["etag"]
+    resp = HttpClient.get(url, headers=request_headers, timeout=10)
+    if resp.status_code == 304 and entry:
+        return entry["releases"], entry.get("next")
+    resp.raise_for_status()
+    data = resp.json()
+    # A single release (releases/tags/<tag>) is cached as a page of one
+    releases = [to_release(release) for release in (data if isinstance(data, list) else [data])]
+    next_url = resp.links.get("next", {}).get("url")
+    with _cache_lock:
+        cache[url] = {"etag": resp.headers.get("ETag"), "releases": releases, "next": next_url}
+    return releases, next_url
+
+def etag(url):
+    """ETag of the newest page of releases, which changes with every new or edited release"""
+    page = f"{url}?per_page={PER_PAGE}"
+    try:
+        fetch_page(page)
+    finally:
+        save_cache()
+    cache = load_cache()
+    with _cache_lock:
+        return cache.get(page, {}).get("etag")
+
+def releases(url, known=(), wanted=None, max_pages=MAX_PAGES):
+    """Published (non-draft, non-prerelease) releases of url, newest first
+
+    Pages are followed until one whose wanted releases are all in known, so older
+    releases are only fetched while there may be something new among them.
+    """
+    known = set(known)
+    result = []
+    next_url = f"{url}?per_page={PER_PAGE}"
+    try:
+        for _ in range(max_pages):
+            page, next_url = fetch_page(next_url)
+            page = [release for release in page if not release["draft"] and not release["prerelease"]]
+            result += page
+            versions = [release["version"] for release in page if wanted is None or wanted(release["version"])]
+            if not next_url or (versions and known.issuperset(versions)):
+                break
+    finally:
+        save_cache()
+    return result
+
+@lru_cache(maxsize=None)
+def release_by_tag(owner, repo, tag):
+    """Release of a tag, None if there is no such release"""
+    api = os.getenv("GITHUB_API_URL", "https://api.github.com")
+    try:
+        return fetch_page(f"{api}/repos/{owner}/{repo}/releases/tags/{tag}")[0][0]
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return None
+        raise
+
+def asset_hashes(release):
+    """SHA256 of the assets of release by name, from their digest or a published checksum file"""
+    hashes = {}
+    for asset in release["assets"]:
+        if (asset.get("digest") or "").startswith("sha256:"):
+            hashes[asset["name"]] = asset["digest"].removeprefix("sha256:").upper()
+    if all(asset["name"] in hashes for asset in release["assets"] if asset["name"] not in CHECKSUM_FILES):
+        return hashes
+    for asset in release["assets"]:
+        if asset["name"] in CHECKSUM_FILES:
+            resp = HttpClient.get(asset["url"], allow_redirects=True, timeout=30)
+            resp.raise_for_status()
+            for sha256, name in CHECKSUM_PATTERN.findall(resp.text):
+                hashes.setdefault(name, sha256.upper())
+            break
+    return hashes
+
+@lru_cache(maxsize=None)
+def tag_hashes(owner, repo, tag):
+    release = release_by_tag(owner, repo, tag)
+    return asset_hashes(release) if release else {}
+
+def asset_digest(url):
+    """Published SHA256 of a github.com release download URL, None if unknown or not a release asset
+
+    Only used with a token, an anonymous client would run out of API budget long before a full link check ends.
+    Callers save_cache() once they are done.
+    """
+    match = DOWNLOAD_PATTERN.match(url)
+    if not match or not token():
+        return None
+    owner, repo, tag, name = match.groups()
+    try:
+        return tag_hashes(owner, repo, tag).get(name)
+    except Exception:
+        return None
+
+def inline_text(text):
+    """Markdown/HTML inline markup of a release body reduced to plain text"""
+    text = re.sub(r"<sup>(.*?)</sup>", r"^{\1}", text)
+    text = re.sub(r"!\[[^\]]*\]\([^)]*\)", "", text)
+    text = re.sub(r"\[([^\]]*)\]\([^)]*\)", r"\1", text)
+    text = re.sub(r"<[^>]+>", "", text)
+    text = re.sub(r"(\*\*|__|`)", "", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+def release_notes(release):
+    """ReleaseNotes lines for a release body: headings as plain lines, list items as '- ' with nesting kept"""
+    lines = []
+    length = 0
+    for raw in (release.get("body") or "").splitlines():
+        heading = re.match(r"^\s*#+\s*(.*)$", raw)
+        item = re.match(r"^(\s*)[*+-]\s+(.*)$", raw)
+        if heading:
+            line = inline_text(heading.group(1))
+        elif item:
+            line = "  " * (len(item.group(1).expandtabs(4)) // 2) + "- " + inline_text(item.group(2))
+        else:
+            line = inline_text(raw)
+        if not line.strip(" -"):
+            continue
+        length += len(line) + 1
+        if length > MAX_NOTES_LENGTH:
+            break
+        lines.append(line)
+    return lines
+
+
+if __name__ == "__main__":
+    for release in releases(sys.argv[1], max_pages=int(sys.argv[2]) if len(sys.argv) > 2 else 1):
+        print(release["version"], len(release["assets"]))
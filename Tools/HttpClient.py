@@ -0,0 +1,108 @@
+import sys
+import time
+import platform
+import requests
+import threading
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+
+TIMEOUT = (5, 30)
+POOL_SIZE = 10
+MAX_RETRIES = 3
+MAX_WAIT = 60
+HOST_POOL_SIZES = {
+    "github.com": 16,
+    "api.github.com": 4,
+    "objects.githubusercontent.com": 16,
+    "release-assets.githubusercontent.com": 16,
+    "www.nirsoft.net": 8,
+    "vovsoft.com": 8,
+}
+
+_session = None
+_session_lock = threading.Lock()
+_limits = {}
+_limits_lock = threading.Lock()
+
+def user_agent():
+    """User-Agent sent with every request"""
+    if hasattr(sys, "getwindowsversion"):
+        v = sys.getwindowsversion()
+        system = f"Windows NT {v.major}.{v.minor}"
+    else:
+        system = f"{platform.system()} {platform.release()}"
+    return (
+        f"Python/{'.'.join((platform.python_version_tuple()[:2]))} "
+        f"({system}; "
+        f"{'Win64; x64' if platform.machine() == 'AMD64' else platform.machine()})"
+    )
+
+def session():
+    """Get the shared keep-alive session, creating it on first use"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers["User-Agent"] = user_agent()
+            for scheme in ("http://", "https://"):
+                _session.mount(scheme, HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE))
+            for host, size in HOST_POOL_SIZES.items():
+                _session.mount(f"https://{host}/", HTTPAdapter(pool_connections=1, pool_maxsize=size))
+        return _session
+
+def throttle(host):
+    """Wait as long as the last seen rate limit headers of host ask for"""
+    with _limits_lock:
+        limit = _limits.get(host)
+    if not limit:
+        return
+    now = time.time()
+    if limit.get("retry_at", 0) > now:
+        time.sleep(min(limit["retry_at"] - now, MAX_WAIT))
+    elif limit.get("remaining") is not None and limit.get("reset", 0) > now:
+        # Spread what is left of the budget over the rest of the window
+        if limit["remaining"] <= 0:
+            time.sleep(min(limit["reset"] - now, MAX_WAIT))
+        elif limit["remaining"] < 10:
+            time.sleep(min((limit["reset"] - now) / limit["remaining"], MAX_WAIT))
+
+def update_limits(host, response):
+    """Remember X-RateLimit-Remaining/Reset and Retry-After of a response"""
+    headers = response.headers
+    limit = {}
+    if "X-RateLimit-Remaining" in headers:
+        limit["remaining"] = int(headers["X-RateLimit-Remaining"])
+        limit["reset"] = float(headers.get("X-RateLimit-Reset", 0))
+    retry_after = headers.get("Retry-After")
+    if retry_after and retry_after.isdigit():
+        limit["retry_at"] = time.time() + int(retry_after)
+    if limit:
+        with _limits_lock:
+            _limits[host] = limit
+
+def is_throttled(response):
+    if response.status_code == 429:
+        return True
+    return response.status_code == 403 and (
+        "Retry-After" in response.headers
+        or response.headers.get("X-RateLimit-Remaining") == "0"
+    )
+
+def request(method, url, **kwargs):
+    """Send a request through the shared session, honoring rate limits of the host"""
+    kwargs.setdefault("timeout", TIMEOUT)
+    host = urlsplit(url).hostname or ""
+    for attempt in range(MAX_RETRIES + 1):
+        throttle(host)
+        response = session().request(method, url, **kwargs)
+        update_limits(host, response)
+        if not is_throttled(response) or attempt == MAX_RETRIES:
+            return response
+        response.close()
+    return response
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+def head(url, **kwargs):
+    return request("HEAD", url, **kwargs)
@@ -0,0 +1,139 @@
+import os
+import sys
+import time
+import uuid
+import hashlib
+import sqlite3
+import threading
+from pathlib import Path
+
+import HttpClient
+
+STORE_DIR = Path(__file__).parent / ".cache" / "installers"
+CHUNK_SIZE = 1 << 16
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    stored REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_used ON blobs (used);
+"""
+
+_local = threading.local()
+
+def store_dir():
+    return Path(os.getenv("INSTALLER_STORE", STORE_DIR))
+
+def max_size():
+    return int(os.getenv("INSTALLER_STORE_MB", "10240")) << 20
+
+def get_store():
+    """Get this thread's connection to the store index, creating the store on first use"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        root = store_dir()
+        (root / "blobs").mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(root / "index.db", timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+def blob_path(sha256):
+    sha256 = sha256.lower()
+    return store_dir() / "blobs" / sha256[:2] / sha256
+
+def get(sha256):
+    """Path of the stored blob with this digest, None if it's not in the store"""
+    path = blob_path(sha256)
+    if not path.exists():
+        return None
+    conn = get_store()
+    with conn:
+        conn.execute("UPDATE blobs SET used = ? WHERE sha256 = ?", (time.time(), sha256.lower()))
+    return path
+
+def lookup(url):
+    """Path of the last blob downloaded from url, None if it's not in the store"""
+    row = get_store().execute("SELECT sha256 FROM urls WHERE url = ?", (url,)).fetchone()
+    return get(row[0]) if row else None
+
+class Writer:
+    """File-like sink that lands in the store under its SHA256 once committed"""
+    def __init__(self):
+        get_store()
+        self.tmp_path = store_dir() / f"{uuid.uuid4().hex}.tmp"
+        self.file = open(self.tmp_path, "wb")
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk):
+        self.file.write(chunk)
+        self.sha256.update(chunk)
+        self.size += len(chunk)
+
+    def commit(self, url=None):
+        """Move the blob into place atomically and point url at it, returns the digest"""
+        self.file.close()
+        digest = self.sha256.hexdigest()
+        path = blob_path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(self.tmp_path, path)
+        now = time.time()
+        conn = get_store()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?)", (digest, self.size, now))
+            if url:
+                conn.execute("INSERT OR REPLACE INTO urls VALUES (?, ?, ?)", (url, digest, now))
+        evict()
+        return digest
+
+    def discard(self):
+        self.file.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if not self.file.closed:
+            self.discard()
+
+def fetch(url, **kwargs):
+    """Path of url's blob, downloading it into the store first if needed"""
+    path = lookup(url)
+    if path:
+        return path
+    with Writer() as writer:
+        with HttpClient.get(url, stream=True, allow_redirects=True, **kwargs) as resp:
+            resp.raise_for_status()
+            for chunk in resp.iter_content(CHUNK_SIZE):
+                writer.write(chunk)
+        return blob_path(writer.commit(url))
+
+def evict():
+    """Drop least recently used blobs until the store fits in INSTALLER_STORE_MB"""
+    conn = get_store()
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+    limit = max_size()
+    if total <= limit:
+        return
+    for sha256, size in conn.execute("SELECT sha256, size FROM blobs ORDER BY used").fetchall():
+        blob_path(sha256).unlink(missing_ok=True)
+        with conn:
+            conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+            conn.execute("DELETE FROM urls WHERE sha256 = ?", (sha256,))
+        total -= size
+        if total <= limit:
+            break
+
+
+if __name__ == "__main__":
+    for url in sys.argv[1:]:
+        print(f"{url} => {fetch(url)}")
@@ -0,0 +1,198 @@
+import os
+import re
+import sys
+import time
+import yaml
+import sqlite3
+import threading
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+INDEX_FILE = Path(__file__).parent / ".cache" / "manifests.db"
+URL_PATTERN = re.compile(r"https?://[^\s'\"<>]+")
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    package_id TEXT,
+    version TEXT,
+    manifest_type TEXT
+);
+CREATE TABLE IF NOT EXISTS urls (
+    path TEXT NOT NULL,
+    url TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS installers (
+    path TEXT NOT NULL,
+    package_id TEXT,
+    version TEXT,
+    architecture TEXT,
+    installer_type TEXT,
+    nested_installer_type TEXT,
+    scope TEXT,
+    url TEXT,
+    sha256 TEXT
+);
+CREATE INDEX IF NOT EXISTS files_package_id ON files (package_id);
+CREATE INDEX IF NOT EXISTS urls_path ON urls (path);
+CREATE INDEX IF NOT EXISTS installers_path ON installers (path);
+CREATE INDEX IF NOT EXISTS installers_url ON installers (url);
+"""
+
+_local = threading.local()
+
+def get_index():
+    """Get this thread's connection to the index, creating the database on first use"""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        path = Path(os.getenv("MANIFEST_INDEX", INDEX_FILE))
+        path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+def key(path):
+    """Index key of a path: posix path relative to the repository, absolute if outside of it"""
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(ROOT).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+def under(folder):
+    """SQL range matching every key below folder ('/' sorts right before '0')"""
+    base = key(folder)
+    return base + "/", base + "0"
+
+def parse(path):
+    """Read a manifest into its files, urls and installers rows"""
+    text = Path(path).read_text(encoding="utf-8", errors="ignore")
+    urls = URL_PATTERN.findall(text)
+    try:
+        data = yaml.load(text, Loader=YAML_LOADER)
+    except yaml.YAMLError:
+        data = None
+    if not isinstance(data, dict):
+        data = {}
+    package_id = data.get("PackageIdentifier")
+    version = data.get("PackageVersion")
+    version = None if version is None else str(version)
+    installers = []
+    for inst in data.get("Installers") or []:
+        if not isinstance(inst, dict):
+            continue
+        installers.append((
+            package_id,
+            version,
+            inst.get("Architecture"),
+            inst.get("InstallerType") or data.get("InstallerType"),
+            inst.get("NestedInstallerType") or data.get("NestedInstallerType"),
+            inst.get("Scope") or data.get("Scope"),
+            inst.get("InstallerUrl"),
+            None if inst.get("InstallerSha256") is None else str(inst["InstallerSha256"]).upper(),
+        ))
+    return (package_id, version, data.get("ManifestType")), urls, installers
+
+def refresh(folder="manifests"):
+    """Bring the index of folder up to date, re-parsing only files whose mtime or size changed"""
+    conn = get_index()
+    base = key(folder)
+    known = dict(conn.execute("SELECT path, fingerprint FROM files WHERE path > ? AND path < ?", under(folder)))
+    seen = set()
+    changed = []
+    for root, _, names in os.walk(folder):
+        for name in names:
+            if not name.lower().endswith((".yaml", ".yml")):
+                continue
+            full = os.path.join(root, name)
+            st = os.stat(full)
+            path = f"{base}/{os.path.relpath(full, folder).replace(os.sep, '/')}"
+            fingerprint = f"{st.st_mtime_ns}:{st.st_size}"
+            seen.add(path)
+            if known.get(path) != fingerprint:
+                changed.append((path, full, fingerprint))
+    removed = [(path,) for path in known.keys() - seen]
+    if not changed and not removed:
+        return 0, 0
+
+    with conn:
+        stale = removed + [(path,) for path, _, _ in changed]
+        for table in ("files", "urls", "installers"):
+            conn.executemany(f"DELETE FROM {table} WHERE path = ?", stale)
+        for path, full, fingerprint in changed:
+            meta, urls, installers = parse(full)
+            conn.execute(
+                "INSERT INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                (path, path.rsplit("/", 1)[0], fingerprint, *meta),
+            )
+            conn.executemany("INSERT INTO urls VALUES (?, ?)", [(path, url) for url in urls])
+            conn.executemany("INSERT INTO installers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", [(path, *inst) for inst in installers])
+    return len(changed), len(removed)
+
+def files(folder):
+    """All manifest files below folder, as paths joined onto folder"""
+    refresh(folder)
+    start = len(under(folder)[0])
+    return [
+        Path(folder, row["path"][start:])
+        for row in get_index().execute("SELECT path FROM files WHERE path > ? AND path < ? ORDER BY path", under(folder))
+    ]
+
+def versions(folder):
+    """Names of all version folders below folder"""
+    refresh(folder)
+    return {
+        row["folder"].rsplit("/", 1)[1]
+        for row in get_index().execute("SELECT DISTINCT folder FROM files WHERE path > ? AND path < ?", under(folder))
+    }
+
+def installers(folder):
+    """All installer entries below folder"""
+    refresh(folder)
+    return [
+        dict(row)
+        for row in get_index().execute("SELECT * FROM installers WHERE path > ? AND path < ? ORDER BY rowid", under(folder))
+    ]
+
+def folder_installers(folder):
+    """Installer entries below folder grouped by version folder, folders without installers included"""
+    refresh(folder)
+    start = len(under(folder)[0])
+    result = {}
+    for row in get_index().execute(
+        "SELECT files.folder AS version_folder, installers.* FROM files LEFT JOIN installers ON installers.path = files.path "
+        "WHERE files.path > ? AND files.path < ? ORDER BY files.folder, installers.rowid",
+        under(folder),
+    ):
+        installers = result.setdefault(Path(folder, row["version_folder"][start:]), [])
+        if row["path"] is not None:
+            installers.append({k: row[k] for k in row.keys() if k != "version_folder"})
+    return result
+
+def installer_urls(folder):
+    """Distinct installer URLs below folder"""
+    refresh(folder)
+    return [
+        row["url"]
+        for row in get_index().execute("SELECT DISTINCT url FROM installers WHERE path > ? AND path < ? AND url IS NOT NULL ORDER BY url", under(folder))
+    ]
+
+def urls(folder):
+    """Every URL found in manifests below folder, mapped per file"""
+    refresh(folder)
+    result = {}
+    for row in get_index().execute("SELECT path, url FROM urls WHERE path > ? AND path < ? ORDER BY rowid", under(folder)):
+        result.setdefault(row["path"], []).append(row["url"])
+    return result
+
+
+if __name__ == "__main__":
+    for folder in sys.argv[1:] or ["manifests"]:
+        start = time.perf_counter()
+        changed, removed = refresh(folder)
+        print(f"{folder}: {changed} updated, {removed} removed in {time.perf_counter() - start:.3f}s")
@@ -0,0 +1,121 @@
+import re
+import yaml
+from pathlib import Path
+
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+SCALAR_PATTERN = r"^(?P<indent>[ -]*){key}:[ \t]*(?P<value>[^\r\n]*)(?P<eol>\r?\n|$)"
+
+def read(path):
+    """Manifest text with its line endings left alone"""
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        return f.read()
+
+def write(path, text):
+    """Write text back through a temporary file so a failure never leaves half a manifest"""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        f.write(text)
+    tmp_path.replace(path)
+
+def eol(text):
+    return "\r\n" if "\r\n" in text else "\n"
+
+def scalar_pattern(key, top_level=False):
+    pattern = SCALAR_PATTERN.format(key=re.escape(key))
+    return pattern.replace("(?P<indent>[ -]*)", "(?P<indent>)") if top_level else pattern
+
+def get_scalar(text, key, top_level=False):
+    match = re.search(scalar_pattern(key, top_level), text, re.MULTILINE)
+    return match.group("value").strip() if match else None
+
+def set_scalar(text, key, value, count=0, top_level=False):
+    """Replace the value of every key: line (or the first count of them), keeping indentation and line endings"""
+    return re.sub(
+        scalar_pattern(key, top_level),
+        lambda m: f"{m.group('indent')}{key}: {value}{m.group('eol')}",
+        text,
+        count=count,
+        flags=re.MULTILINE,
+    )
+
+def block_span(text, key):
+    """(start, end) of a top-level key and everything indented below it, None if key is missing"""
+    match = re.search(rf"^{re.escape(key)}:[^\r\n]*(\r?\n|$)", text, re.MULTILINE)
+    if not match:
+        return None
+    end = match.end()
+    for line in re.finditer(r"[^\r\n]*(\r?\n|$)", text[end:]):
+        if not line.group(0) or not (line.group(0).startswith((" ", "\t")) or not line.group(0).strip()):
+            break
+        end += len(line.group(0))
+    return match.start(), end
+
+def set_block(text, key, lines, before=("ReleaseNotesUrl", "ManifestType")):
+    """Replace a top-level literal block (key: |-) with lines, inserting it before the first of before if missing"""
+    newline = eol(text)
+    # A first line that is indented itself would set the block's indentation, so state it
+    indicator = "|2-" if next((line for line in lines if line.strip()), "")[:1].isspace() else "|-"
+    block = f"{key}: {indicator}{newline}" + "".join(f"  {line}{newline}" if line else newline for line in lines)
+    span = block_span(text, key)
+    if span is None:
+        for anchor in before:
+            match = re.search(rf"^{re.escape(anchor)}:", text, re.MULTILINE)
+            if match:
+                span = (match.start(), match.start())
+                break
+        else:
+            span = (len(text), len(text))
+            if text and not text.endswith("\n"):
+                block = newline + block
+    return text[:span[0]] + block + text[span[1]:]
+
+def drop_block(text, key):
+    """Remove a top-level key and everything indented below it, if present"""
+    span = block_span(text, key)
+    return text if span is None else text[:span[0]] + text[span[1]:]
+
+def load(text):
+    """Parsed text, None if it is not valid YAML"""
+    try:
+        return yaml.load(text, Loader=YAML_LOADER)
+    except yaml.YAMLError:
+        return None
+
+def drop_tool_header(text):
+    """Remove the '# Created with <tool>' comment of manifests no longer written by that tool"""
+    return re.sub(r"\A(\ufeff?)# Created with [^\r\n]*\r?\n", r"\1", text)
+
+def set_installer_hashes(text, hashes):
+    """Rewrite the InstallerSha256 of each installer whose InstallerUrl is in hashes, returns (text, changed urls)
+
+    Url and hash are paired within one '- ' item of a list, in whichever order they appear;
+    deeper nested lists stay part of the item and a top-level key ends it.
+    """
+    changed = []
+    lines = text.splitlines(keepends=True)
+    items = []
+    item = None
+    for i, line in enumerate(lines):
+        entry = re.match(r"^( *)- ", line)
+        if entry and (item is None or len(entry.group(1)) <= item["indent"]):
+            item = {"indent": len(entry.group(1)), "url": None, "sha256": None}
+            items.append(item)
+        elif line.strip() and not line[:1].isspace() and not line.startswith(("-", "#")):
+            item = None
+        if item is None:
+            continue
+        match = re.match(r"^[ -]*InstallerUrl:[ \t]*(\S+)", line)
+        if match:
+            item["url"] = match.group(1).strip("'\"")
+        elif re.match(r"^[ -]*InstallerSha256:", line):
+            item["sha256"] = i
+    for item in items:
+        if item["url"] not in hashes or item["sha256"] is None:
+            continue
+        match = re.match(r"^([ -]*)InstallerSha256:[ \t]*(\S+)(\s*)$", lines[item["sha256"]])
+        sha256 = hashes[item["url"]].upper()
+        if match and match.group(2).strip("'\"").upper() != sha256:
+            lines[item["sha256"]] = f"{match.group(1)}InstallerSha256: {sha256}{match.group(3)}"
+            changed.append(item["url"])
+    return "".join(lines), changed
@@ -0,0 +1,306 @@
+import os
+import re
+import sys
+import json
+import time
+import yaml
+import hashlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+CACHE_FILE = Path(__file__).parent / ".cache" / "manifest_validation.json"
+# Bump whenever the rules change, cached verdicts of older rules are dropped
+RULES_VERSION = 1
+MAX_ENTRIES = 20000
+POOL_MIN = 200
+# Every scalar as a string, like winget reads them (1.10 stays 1.10)
+YAML_LOADER = getattr(yaml, "CBaseLoader", yaml.BaseLoader)
+
+MANIFEST_TYPES = ("version", "installer", "defaultLocale", "locale", "singleton")
+REQUIRED = {
+    "version": ("PackageIdentifier", "PackageVersion", "DefaultLocale", "ManifestType", "ManifestVersion"),
+    "installer": ("PackageIdentifier", "PackageVersion", "Installers", "ManifestType", "ManifestVersion"),
+    "defaultLocale": ("PackageIdentifier", "PackageVersion", "PackageLocale", "Publisher", "PackageName", "License", "ShortDescription", "ManifestType", "ManifestVersion"),
+    "locale": ("PackageIdentifier", "PackageVersion", "PackageLocale", "ManifestType", "ManifestVersion"),
+    "singleton": ("PackageIdentifier", "PackageVersion", "PackageLocale", "Publisher", "PackageName", "License", "ShortDescription", "Installers", "ManifestType", "ManifestVersion"),
+}
+INSTALLER_REQUIRED = ("Architecture", "InstallerUrl", "InstallerSha256")
+PATTERNS = {
+    "PackageIdentifier": re.compile(r"^[^\.\s\\/:\*\?\"<>\|\x01-\x1f]{1,32}(\.[^\.\s\\/:\*\?\"<>\|\x01-\x1f]{1,32}){1,7}$"),
+    "PackageVersion": re.compile(r"^[^\\/:\*\?\"<>\|\x01-\x1f]{1,128}$"),
+    "PackageLocale": re.compile(r"^([a-zA-Z]{2,3}|[iI]-[a-zA-Z]+|[xX]-[a-zA-Z]{1,8})(-[a-zA-Z]{1,8})*$"),
+    "DefaultLocale": re.compile(r"^([a-zA-Z]{2,3}|[iI]-[a-zA-Z]+|[xX]-[a-zA-Z]{1,8})(-[a-zA-Z]{1,8})*$"),
+    "ManifestVersion": re.compile(r"^(0|[1-9][0-9]{0,3}|[1-5][0-9]{4}|6[0-4][0-9]{3}|65[0-4][0-9]{2}|655[0-2][0-9]|6553[0-5])(\.(0|[1-9][0-9]{0,3}|[1-5][0-9]{4}|6[0-4][0-9]{3}|65[0-4][0-9]{2}|655[0-2][0-9]|6553[0-5])){2}$"),
+    "InstallerUrl": re.compile(r"^([Hh][Tt][Tt][Pp][Ss]?)://.+$"),
+    "InstallerSha256": re.compile(r"^[A-Fa-f0-9]{64}$"),
+}
+URL_FIELDS = ("PackageUrl", "PublisherUrl", "PublisherSupportUrl", "PrivacyUrl", "LicenseUrl", "CopyrightUrl", "ReleaseNotesUrl", "PurchaseUrl")
+LENGTHS = {
+    "Publisher": (2, 256),
+    "PackageName": (2, 256),
+    "License": (3, 512),
+    "ShortDescription": (3, 256),
+    "Description": (3, 10000),
+    "ReleaseNotes": (1, 10000),
+}
+ENUMS = {
+    "Architecture": ("x86", "x64", "arm", "arm64", "neutral"),
+    "InstallerType": ("msix", "msi", "appx", "exe", "zip", "inno", "nullsoft", "wix", "burn", "pwa", "portable", "font"),
+    "NestedInstallerType": ("msix", "msi", "appx", "exe", "inno", "nullsoft", "wix", "burn", "portable", "font"),
+    "Scope": ("user", "machine"),
+    "UpgradeBehavior": ("install", "uninstallPrevious", "deny"),
+}
+
+def check_fields(data, where, errors):
+    """Patterns, lengths and allowed values of the fields present in data"""
+    for field, pattern in PATTERNS.items():
+        value = data.get(field)
+        if isinstance(value, str) and not pattern.match(value):
+            errors.append(f"{where}{field} is not valid: {value}")
+    for field, allowed in ENUMS.items():
+        value = data.get(field)
+        if isinstance(value, str) and value not in allowed:
+            errors.append(f"{where}{field} must be one of {', '.join(allowed)}: {value}")
+    for field, (low, high) in LENGTHS.items():
+        value = data.get(field)
+        if isinstance(value, str) and not low <= len(value) <= high:
+            errors.append(f"{where}{field} must be {low} to {high} characters long")
+    for field in URL_FIELDS:
+        value = data.get(field)
+        if isinstance(value, str) and not PATTERNS["InstallerUrl"].match(value):
+            errors.append(f"{where}{field} is not an http(s) URL: {value}")
+    sha256 = data.get("InstallerSha256")
+    if isinstance(sha256, str) and PATTERNS["InstallerSha256"].match(sha256) and sha256 != sha256.upper():
+        errors.append(f"{where}InstallerSha256 is not uppercase (see UppercaseChecksum.ps1)")
+
+def expected_name(data):
+    package_id = data.get("PackageIdentifier")
+    manifest_type = data.get("ManifestType")
+    if manifest_type == "installer":
+        return f"{package_id}.installer.yaml"
+    if manifest_type in ("defaultLocale", "locale"):
+        return f"{package_id}.locale.{data.get('PackageLocale')}.yaml"
+    return f"{package_id}.yaml"
+
+def validate_text(name, folder_name, text):
+    """Verdict of one manifest on its own: (errors, summary for the folder checks)"""
+    errors = []
+    try:
+        data = yaml.load(text, Loader=YAML_LOADER)
+    except yaml.YAMLError as e:
+        return [f"Not valid YAML: {str(e).splitlines()[0]}"], None
+    if not isinstance(data, dict):
+        return ["Not a YAML mapping"], None
+
+    manifest_type = data.get("ManifestType")
+    if manifest_type not in MANIFEST_TYPES:
+        return [f"Unknown ManifestType: {manifest_type}"], None
+    for field in REQUIRED[manifest_type]:
+        if data.get(field) in (None, "", []):
+            errors.append(f"Missing required field {field}")
+    check_fields(data, "", errors)
+    if data.get("PackageVersion") is not None and data["PackageVersion"] != folder_name:
+        errors.append(f"PackageVersion {data['PackageVersion']} does not match folder {folder_name}")
+    if data.get("PackageIdentifier") and name != expected_name(data):
+        errors.append(f"File name should be {expected_name(data)}")
+
+    installers = []
+    if manifest_type in ("installer", "singleton"):
+        entries = data.get("Installers")
+        if not isinstance(entries, list):
+            entries = []
+            if data.get("Installers") not in (None, "", []):
+                errors.append("Installers must be a list")
+        seen = {}
+        for index, inst in enumerate(entries, 1):
+            where = f"Installer {index}: "
+            if not isinstance(inst, dict):
+                errors.append(f"{where}not a mapping")
+                continue
+            for field in INSTALLER_REQUIRED:
+                if inst.get(field) in (None, ""):
+                    errors.append(f"{where}missing required field {field}")
+            if not (inst.get("InstallerType") or data.get("InstallerType")):
+                errors.append(f"{where}missing required field InstallerType")
+            check_fields(inst, where, errors)
+            # winget picks installers by these, two entries alike can never both be chosen
+            key = tuple(inst.get(field) or data.get(field) for field in ("Architecture", "InstallerType", "Scope", "InstallerLocale"))
+            if key in seen:
+                errors.append(f"{where}same Architecture, InstallerType, Scope and InstallerLocale as installer {seen[key]}")
+            seen.setdefault(key, index)
+            installers.append((inst.get("InstallerUrl"), (inst.get("InstallerSha256") or "").upper()))
+
+    summary = {
+        "type": manifest_type,
+        "id": data.get("PackageIdentifier"),
+        "version": data.get("PackageVersion"),
+        "manifest_version": data.get("ManifestVersion"),
+        "default_locale": data.get("DefaultLocale"),
+        "locale": data.get("PackageLocale"),
+        "installers": installers,
+    }
+    return errors, summary
+
+def validate_many(items):
+    return [validate_text(*item) for item in items]
+
+def check_folder(folder, summaries):
+    """Checks across the manifests of one version folder, summaries by file name"""
+    errors = []
+    by_type = {}
+    for name, summary in summaries.items():
+        if summary:
+            by_type.setdefault(summary["type"], []).append(name)
+    if "singleton" in by_type:
+        if len(summaries) > 1:
+            errors.append("A singleton manifest must be the only manifest of its folder")
+    else:
+        for manifest_type in ("version", "installer", "defaultLocale"):
+            count = len(by_type.get(manifest_type, []))
+            if count != 1:
+                errors.append(f"Expected one {manifest_type} manifest, found {count}")
+        versions = [summaries[name] for name in by_type.get("version", [])]
+        default_locales = [summaries[name]["locale"] for name in by_type.get("defaultLocale", [])]
+        if len(versions) == 1 and default_locales and versions[0]["default_locale"] not in default_locales:
+            errors.append(f"DefaultLocale {versions[0]['default_locale']} has no defaultLocale manifest")
+    for field, label in (("id", "PackageIdentifier"), ("version", "PackageVersion"), ("manifest_version", "ManifestVersion")):
+        values = {summary[field] for summary in summaries.values() if summary and summary[field]}
+        if len(values) > 1:
+            errors.append(f"{label} differs between manifests: {', '.join(sorted(values))}")
+    ids = {summary["id"] for summary in summaries.values() if summary and summary["id"]}
+    if len(ids) == 1:
+        parts = next(iter(ids)).split(".")
+        if list(Path(folder).parent.parts[-len(parts):]) != parts:
+            errors.append(f"Folder does not match PackageIdentifier {next(iter(ids))}")
+    return errors
+
+def check_urls(folders):
+    """InstallerUrls listed with different InstallerSha256 within one package, by folder"""
+    hashes = {}
+    for folder, summaries in folders.items():
+        for summary in summaries.values():
+            for url, sha256 in (summary or {}).get("installers", []):
+                if url and sha256:
+                    hashes.setdefault((Path(folder).parent, url), {}).setdefault(sha256, []).append(folder)
+    errors = {}
+    for (_, url), by_hash in hashes.items():
+        if len(by_hash) > 1:
+            for sha256, owners in by_hash.items():
+                for folder in owners:
+                    errors.setdefault(folder, []).append(f"Duplicate InstallerUrl with different InstallerSha256 across versions: {url}")
+    return errors
+
+def cache_path():
+    return Path(os.getenv("VALIDATOR_CACHE", CACHE_FILE))
+
+def load_cache():
+    try:
+        cache = json.loads(cache_path().read_text(encoding="utf-8"))
+        if cache.get("rules") == RULES_VERSION:
+            return cache["files"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return {}
+
+def save_cache(files):
+    path = cache_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps({"rules": RULES_VERSION, "files": files}), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+def manifest_files(paths):
+    """(folder, file name, full path) of every manifest below paths"""
+    found = {}
+    for path_raw in paths:
+        path = Path(path_raw)
+        if path.is_file() and path.suffix.lower() in (".yml", ".yaml"):
+            found[str(path)] = (str(path.parent), path.name, str(path))
+            continue
+        if not path.is_dir():
+            print(f"Path doesn't exist: {path_raw}")
+            continue
+        for root, _, names in os.walk(path):
+            for name in names:
+                if name.lower().endswith((".yaml", ".yml")):
+                    full = os.path.join(root, name)
+                    found[full] = (root, name, full)
+    return sorted(found.values())
+
+def validate(paths, jobs=None, use_cache=True):
+    """Validate every manifest below paths, returns ({folder: {file name or '': errors}}, stats)"""
+    files = manifest_files(paths)
+    cache = load_cache() if use_cache else {}
+    verdicts = {}
+    misses = []
+    for folder, name, full in files:
+        with open(full, "rb") as f:
+            content = f.read()
+        digest = hashlib.sha256(f"{Path(folder).name}/{name}\0".encode("utf-8") + content).hexdigest()
+        verdicts[full] = digest
+        if digest not in cache:
+            misses.append((full, (name, Path(folder).name, content.decode("utf-8-sig", errors="replace"))))
+
+    if misses:
+        items = [item for _, item in misses]
+        if len(misses) >= POOL_MIN and (jobs or os.cpu_count() or 1) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                chunks = [items[i:i + 50] for i in range(0, len(items), 50)]
+                results = [result for chunk in pool.map(validate_many, chunks) for result in chunk]
+        else:
+            results = validate_many(items)
+        for (full, _), result in zip(misses, results):
+            cache[verdicts[full]] = list(result)
+
+    folders = {}
+    for folder, name, full in files:
+        folders.setdefault(folder, {})[name] = cache[verdicts[full]]
+    report = {}
+    for folder, results in folders.items():
+        errors = {name: result[0] for name, result in results.items() if result[0]}
+        folder_errors = check_folder(folder, {name: result[1] for name, result in results.items()})
+        if folder_errors:
+            errors[""] = folder_errors
+        if errors:
+            report[folder] = errors
+    summaries = {folder: {name: result[1] for name, result in results.items()} for folder, results in folders.items()}
+    for folder, errors in check_urls(summaries).items():
+        report.setdefault(folder, {}).setdefault("", []).extend(errors)
+
+    if use_cache:
+        # Most recently seen last, the oldest verdicts go first once the cache is full
+        for digest in verdicts.values():
+            cache[digest] = cache.pop(digest)
+        save_cache(dict(list(cache.items())[-MAX_ENTRIES:]))
+    return report, {"files": len(files), "folders": len(folders), "validated": len(misses)}
+
+def main(paths):
+    start = time.perf_counter()
+    jobs = int(os.getenv("VALIDATOR_JOBS", "0")) or None
+    use_cache = os.getenv("NO_CACHE", "0").lower() not in ("true", "1")
+    report, stats = validate(paths, jobs, use_cache)
+    count = 0
+    for folder in sorted(report):
+        print(f"Folder: {folder}")
+        for name, errors in sorted(report[folder].items()):
+            for error in errors:
+                print(f"  {name + ': ' if name else ''}{error}")
+                count += 1
+                if os.getenv("GITHUB_ACTIONS"):
+                    print(f"::error file={Path(folder, name).as_posix() if name else Path(folder).as_posix()}::{error}")
+    print(
+        f"Checked {stats['files']} files in {stats['folders']} folders "
+        f"({stats['validated']} validated, {stats['files'] - stats['validated']} cached) "
+        f"in {time.perf_counter() - start:.2f}s: {count} error(s)"
+    )
+    return count
+
+if __name__ == "__main__":
+    if "--no-cache" in sys.argv:
+        os.environ["NO_CACHE"] = str(True)
+        sys.argv.remove("--no-cache")
+    if "--jobs" in sys.argv:
+        i = sys.argv.index("--jobs")
+        os.environ["VALIDATOR_JOBS"] = sys.argv[i + 1]
+        del sys.argv[i:i + 2]
+    sys.exit(1 if main(sys.argv[1:] or ["manifests"]) else 0)
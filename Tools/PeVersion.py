@@ -0,0 +1,200 @@
+import sys
+import struct
+from pathlib import Path
+
+import HttpClient
+import InstallerStore
+
+BLOCK_SIZE = 1 << 16
+RT_VERSION = 16
+FIXED_FILE_INFO_SIGNATURE = 0xFEEF04BD
+
+class FileReader:
+    """Random access to a local file"""
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.fetched = 0
+
+    def read(self, offset, size):
+        self.file.seek(offset)
+        return self.file.read(size)
+
+    def close(self):
+        self.file.close()
+
+class RangeReader:
+    """Random access to a remote file through HTTP Range requests, one aligned block at a time"""
+    def __init__(self, url, first):
+        self.url = url
+        self.blocks = {0: first}
+        self.fetched = len(first)
+
+    @classmethod
+    def open(cls, url):
+        """RangeReader for url, or a FileReader on a stored copy when the server ignores ranges"""
+        resp = HttpClient.get(url, headers={"Range": f"bytes=0-{BLOCK_SIZE - 1}"}, stream=True, allow_redirects=True)
+        if resp.status_code == 206:
+            with resp:
+                return cls(resp.url, resp.content)
+        resp.raise_for_status()
+        # Full body coming anyway: keep it in the store rather than throwing it away
+        with resp, InstallerStore.Writer() as writer:
+            for chunk in resp.iter_content(InstallerStore.CHUNK_SIZE):
+                writer.write(chunk)
+            path = InstallerStore.blob_path(writer.commit(url))
+        reader = FileReader(path)
+        reader.fetched = writer.size
+        return reader
+
+    def block(self, index):
+        if index not in self.blocks:
+            start = index * BLOCK_SIZE
+            with HttpClient.get(self.url, headers={"Range": f"bytes={start}-{start + BLOCK_SIZE - 1}"}) as resp:
+                if resp.status_code == 416:
+                    data = b""
+                elif resp.status_code == 206:
+                    data = resp.content
+                else:
+                    resp.raise_for_status()
+                    raise RuntimeError(f"Range request for {self.url} answered with {resp.status_code}")
+            self.blocks[index] = data
+            self.fetched += len(data)
+        return self.blocks[index]
+
+    def read(self, offset, size):
+        data = b""
+        for index in range(offset // BLOCK_SIZE, (offset + size - 1) // BLOCK_SIZE + 1):
+            data += self.block(index)
+        start = offset - offset // BLOCK_SIZE * BLOCK_SIZE
+        return data[start:start + size]
+
+    def close(self):
+        self.blocks.clear()
+
+def open_reader(target):
+    """Reader for a local path, an installer already in the store or a URL"""
+    if Path(target).is_file():
+        return FileReader(target)
+    stored = InstallerStore.lookup(target)
+    if stored:
+        return FileReader(stored)
+    return RangeReader.open(target)
+
+def unpack(fmt, data, offset=0):
+    return struct.unpack_from(f"<{fmt}", data, offset)
+
+def version_resource(reader):
+    """Raw bytes of the first RT_VERSION resource, None if the file has none"""
+    header = reader.read(0, 64)
+    if header[:2] != b"MZ":
+        raise ValueError("Not a PE file")
+    pe_offset, = unpack("I", header, 0x3C)
+    coff = reader.read(pe_offset, 24)
+    if coff[:4] != b"PE\0\0":
+        raise ValueError("Not a PE file")
+    sections_count, optional_size = unpack("H", coff, 6)[0], unpack("H", coff, 20)[0]
+    optional = reader.read(pe_offset + 24, optional_size)
+    magic, = unpack("H", optional)
+    directories = 96 if magic == 0x10B else 112
+    resource_rva, resource_size = unpack("II", optional, directories + 2 * 8)
+    if not resource_rva:
+        return None
+
+    sections = reader.read(pe_offset + 24 + optional_size, 40 * sections_count)
+    def file_offset(rva):
+        for i in range(sections_count):
+            virtual_size, virtual_address, raw_size, raw_pointer = unpack("IIII", sections, i * 40 + 8)
+            if virtual_address <= rva < virtual_address + max(virtual_size, raw_size):
+                return rva - virtual_address + raw_pointer
+        raise ValueError(f"RVA {rva:#x} is outside of every section")
+
+    root = file_offset(resource_rva)
+    def entries(offset):
+        directory = reader.read(root + offset, 16)
+        named, ids = unpack("HH", directory, 12)
+        table = reader.read(root + offset + 16, 8 * (named + ids))
+        return [unpack("II", table, i * 8) for i in range(named + ids)]
+
+    # Type -> name -> language, taking the first name and language of RT_VERSION
+    offset = next((data for name, data in entries(0) if name == RT_VERSION), None)
+    for _ in range(2):
+        if offset is None or not offset & 0x80000000:
+            return None
+        children = entries(offset & 0x7FFFFFFF)
+        offset = children[0][1] if children else None
+    if offset is None or offset & 0x80000000:
+        return None
+    data_rva, data_size = unpack("II", reader.read(root + offset, 8))
+    return reader.read(file_offset(data_rva), data_size)
+
+def parse_block(data, offset):
+    """One VS_VERSIONINFO style node: (key, value bytes, children, end offset)"""
+    length, value_length, value_type = unpack("HHH", data, offset)
+    end = offset + length
+    key_end = offset + 6
+    while data[key_end:key_end + 2] != b"\0\0":
+        key_end += 2
+    key = data[offset + 6:key_end].decode("utf-16-le")
+    value_start = (key_end + 2 + 3) & ~3
+    # Text values are measured in WCHARs, binary ones in bytes
+    value_end = value_start + value_length * (2 if value_type == 1 else 1)
+    value = data[value_start:min(value_end, end)]
+    children = []
+    child = (value_end + 3) & ~3
+    while child + 6 <= end:
+        child_length, = unpack("H", data, child)
+        if not child_length:
+            break
+        children.append(parse_block(data, child))
+        child = (child + child_length + 3) & ~3
+    return key, value, children, end
+
+def fixed_version(ms, ls):
+    return f"{ms >> 16}.{ms & 0xFFFF}.{ls >> 16}.{ls & 0xFFFF}"
+
+def parse_version_info(data):
+    """Strings of the first StringFileInfo table, with the fixed file and product versions as fallback"""
+    key, value, children, _ = parse_block(data, 0)
+    if key != "VS_VERSION_INFO":
+        raise ValueError("Not a VS_VERSIONINFO resource")
+    info = {}
+    if len(value) >= 52 and unpack("I", value)[0] == FIXED_FILE_INFO_SIGNATURE:
+        file_ms, file_ls, product_ms, product_ls = unpack("IIII", value, 8)
+        info["FileVersion"] = fixed_version(file_ms, file_ls)
+        info["ProductVersion"] = fixed_version(product_ms, product_ls)
+    for child_key, _, tables, _ in children:
+        if child_key != "StringFileInfo" or not tables:
+            continue
+        for name, text, _, _ in tables[0][2]:
+            info[name] = text.decode("utf-16-le", errors="replace").rstrip("\0").strip()
+    return info
+
+def version_info(target):
+    """Version resource strings of a PE file given as a local path or URL, {} if it has none"""
+    reader = open_reader(target)
+    try:
+        data = version_resource(reader)
+        return parse_version_info(data) if data else {}
+    finally:
+        reader.close()
+
+def product_version(target):
+    """ProductVersion as Windows shows it for the file"""
+    version = version_info(target).get("ProductVersion")
+    if not version:
+        raise RuntimeError(f"No ProductVersion in {target}")
+    return version
+
+
+if __name__ == "__main__":
+    for target in sys.argv[1:]:
+        print(f"Checking {target}...")
+        reader = open_reader(target)
+        try:
+            data = version_resource(reader)
+            for name, value in (parse_version_info(data) if data else {}).items():
+                print(f"{name}: {value}")
+            print(f"Fetched: {reader.fetched} bytes")
+        finally:
+            reader.close()
+        print()
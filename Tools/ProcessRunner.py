@@ -0,0 +1,126 @@
+import re
+import sys
+import codecs
+import psutil
+import asyncio
+import locale
+import subprocess
+from collections import deque
+
+CHUNK_SIZE = 1 << 16
+
+class Capture:
+    """Keeps the lines of a command's stdout: all of them, the last tail ones or those matching pattern"""
+    def __init__(self, tail=None, pattern=None):
+        self.lines = deque(maxlen=tail) if tail else []
+        self.pattern = re.compile(pattern, re.MULTILINE) if isinstance(pattern, str) else pattern
+
+    def add(self, line):
+        if self.pattern is None or self.pattern.search(line):
+            self.lines.append(line)
+
+    def text(self):
+        return "".join(self.lines)
+
+def split_lines(text):
+    """Complete lines of text and the unfinished rest, \r\n and lone \r read as \n like text=True does"""
+    *lines, rest = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return [line + "\n" for line in lines], rest
+
+async def read_lines(stream, on_line):
+    """Feed each decoded line of stream to on_line, no matter how long the line is"""
+    decoder = codecs.getincrementaldecoder(locale.getpreferredencoding(False))(errors="replace")
+    pending = ""
+    while chunk := await stream.read(CHUNK_SIZE):
+        pending += decoder.decode(chunk)
+        # A trailing \r may be the first half of a \r\n split across chunks
+        held = "\r" if pending.endswith("\r") else ""
+        lines, pending = split_lines(pending[:len(pending) - len(held)])
+        pending += held
+        for line in lines:
+            on_line(line)
+    lines, pending = split_lines(pending + decoder.decode(b"", final=True))
+    for line in lines:
+        on_line(line)
+    if pending:
+        on_line(pending)
+
+def kill_tree(pid):
+    """Kill a process along with everything it started (cmd.exe, powershell, ...)"""
+    try:
+        parent = psutil.Process(pid)
+        procs = [parent] + parent.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return
+    for proc in procs:
+        try:
+            proc.kill()
+        except psutil.NoSuchProcess:
+            pass
+
+async def run_async(command, *, timeout=None, tail=None, pattern=None, capture=True, echo=True, prefix="", check=True, **kwargs):
+    """Run command (a string through the shell, a list as argv) streaming its output, returns captured stdout
+
+    stdout and stderr are read on the event loop, so any number of commands can share one thread.
+    Past timeout seconds the whole process tree is killed and subprocess.TimeoutExpired raised.
+    """
+    if isinstance(command, str):
+        proc = await asyncio.create_subprocess_shell(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs)
+    else:
+        proc = await asyncio.create_subprocess_exec(*command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, **kwargs)
+    output = Capture(tail, pattern) if capture else None
+
+    def on_stdout(line):
+        if echo:
+            print(f"{prefix}{line}", end="")
+        if output is not None:
+            output.add(line)
+
+    def on_stderr(line):
+        if echo:
+            print(f"{prefix}{line}", end="")
+
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(read_lines(proc.stdout, on_stdout), read_lines(proc.stderr, on_stderr), proc.wait()),
+            timeout,
+        )
+    except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+        # Timed out or interrupted (Ctrl+C), don't leave the command running behind us
+        kill_tree(proc.pid)
+        await proc.wait()
+        if isinstance(e, asyncio.TimeoutError):
+            raise subprocess.TimeoutExpired(command, timeout, output.text() if output is not None else None) from None
+        raise
+    finally:
+        sys.stdout.flush()
+
+    text = output.text() if output is not None else None
+    if check and proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, command, text)
+    return text
+
+async def gather(commands, jobs=None, **kwargs):
+    """run_async every command, at most jobs at a time, returning each output or the exception it raised"""
+    semaphore = asyncio.Semaphore(jobs or len(commands) or 1)
+
+    async def bounded(command):
+        async with semaphore:
+            return await run_async(command, **kwargs)
+
+    return await asyncio.gather(*(bounded(command) for command in commands), return_exceptions=True)
+
+def run(command, **kwargs):
+    """Blocking run_async, usable from any thread"""
+    return asyncio.run(run_async(command, **kwargs))
+
+def run_many(commands, jobs=None, **kwargs):
+    """Run commands concurrently under one event loop, at most jobs at a time
+
+    Returns the captured output of each command in order, or the exception it raised.
+    """
+    return asyncio.run(gather(list(commands), jobs, **kwargs))
+
+
+if __name__ == "__main__":
+    print(run(sys.argv[1:] if len(sys.argv) > 2 else sys.argv[1], echo=False), end="")
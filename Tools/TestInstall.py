@@ -1,32 +1,33 @@
 import os
-import io
 import sys
 import json
-import yaml
 import time
 import atexit
 import ctypes
 import shutil
 import psutil
 import tempfile
-import platform
 import traceback
 import threading
 import subprocess
 from mss import MSS
-from glob import glob
 from pathlib import Path
 from ctypes import wintypes
-from datetime import datetime
+from datetime import datetime, timezone
 
-_buffer = io.StringIO()
+import TestPlan
 
-def _print(*args, **kwargs):
-    print(*args, file=_buffer, **kwargs)
+ss_dir = Path(__file__).parent / "ss"
+_records = []
 
 @atexit.register
-def _flush_buffer():
-    sys.stdout.write(_buffer.getvalue())
+def _print_results():
+    for record in _records:
+        print(f"\nFolder: {record['label']}")
+        if record["same_as"]:
+            print(f"Same installers as: {record['same_as']}")
+        print(f"Install succeed: {record['install']}")
+        print(f"Uninstall succeed: {record['uninstall']}")
     if sys.stdout.isatty() and not os.getenv("GITHUB_ACTIONS"):
         sys.stdout.write("\033]9;4;0\007") # For resetting terminal state
     sys.stdout.flush()
@@ -129,35 +130,6 @@ def get_screenshots(stop_event, folder, interval=10):
             sct.shot(mon=monitor_index, output=str(img_path))
             time.sleep(interval)
 
-def get_installers(directory):
-    """Get all installers from package's installer.yml"""
-    pairs = set()
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith((".installer.yml", ".installer.yaml")):
-                with open(os.path.join(root, file), "r", encoding="utf-8") as f:
-                    data = yaml.safe_load(f) or {}
-                default_inst_type = data.get("InstallerType")
-                default_nested_inst_type = data.get("NestedInstallerType")
-                for inst in data.get("Installers", []):
-                    if not isinstance(inst, dict):
-                        continue
-                    arch = inst.get("Architecture")
-                    inst_type = inst.get("InstallerType") or default_inst_type
-                    nested_inst_type = inst.get("NestedInstallerType") or default_nested_inst_type
-                    is_portable = (
-                        inst_type == "portable"
-                        or nested_inst_type == "portable"
-                    )
-                    pairs.add((arch, inst_type, is_portable))
-    return [ # make sure portable installer type always sorted last
-        (arch, inst_type)
-        for arch, inst_type, _ in sorted(
-            pairs,
-            key=lambda x: (x[2], x[1] or "", x[0] or "")
-        )
-    ]
-
 def run_powershell(script_path, *args, timeout=600):
     """Run a PowerShell script with timeout, streaming output to console"""
     cmd = ["powershell", "-ExecutionPolicy", "Bypass", "-File", str(script_path), *map(str, args)]
@@ -240,63 +212,70 @@ def test_install(directory, args = ""):
     return {"INST": install_success, "UNINST": uninstall_success}
 
 def main(paths):
-    seen = set()
-    sort_key = lambda p: (
-        2 if ".installer." in p.name.lower()
-        else 1 if ".locale." in p.name.lower()
-        else 0,
-        p.name.lower()
-    )
+    if os.getenv("TEST_FROM_PLAN"):
+        plan = TestPlan.load(os.getenv("TEST_FROM_PLAN"))
+    else:
+        plan = TestPlan.build(paths)
+    if os.getenv("TEST_SHARD"):
+        index, count = TestPlan.parse_shard(os.getenv("TEST_SHARD"))
+        if plan.get("shards") is None or len(plan["shards"]) != count:
+            TestPlan.assign_shards(plan, count)
+        TestPlan.select_shard(plan, index)
+    if os.getenv("TEST_PLAN"):
+        TestPlan.save(plan, os.getenv("TEST_PLAN"))
+        print(f"Plan written to {os.getenv('TEST_PLAN')}: {TestPlan.summary(plan)}")
+        return
+    print(TestPlan.summary(plan))
     
+    if os.getenv("TEST_RESUME", "0").lower() in ("true", "1"):
+        run, recorded = TestPlan.load_results()
+    else:
+        run, recorded = TestPlan.start_run(), {}
+    
+    results = {}
     try:
-        for path_raw in paths:
-            paths_resolved = glob(path_raw)
-            if not paths_resolved:
-                if "*" in path_raw:
-                    parts = path_raw.rsplit("\\", 1)
-                    if len(parts) == 2:
-                        path_raw_rs = str(Path(parts[0]) / "**" / parts[1])
-                        paths_resolved = glob(path_raw_rs, recursive=True)
-            if not paths_resolved:
-                print(f"Path doesn't exist: {path_raw}")
+        for index, entry in enumerate(plan["entries"]):
+            if entry["skip"] not in (None, "duplicate"):
+                continue
+            pkg_label = TestPlan.label(entry)
+            record = recorded.get(TestPlan.result_key(entry))
+            if record is not None:
+                # Finished by an earlier attempt
+                results[index] = record
+                _records.append(record)
                 continue
-            for path_each in paths_resolved:
-                path = Path(path_each)
-                if not path.exists():
-                    print(f"Path doesn't exist: {path}")
-                if path.is_file() and path.suffix.lower() in [".yml", ".yaml"]:
-                    file_paths = [path]
-                elif path.is_dir():
-                    file_paths = sorted(path.rglob("*.y*ml"), key=sort_key)
-                else:
+            seconds = None
+            if entry["skip"] == "duplicate":
+                # Same installers were tested already under another label
+                result = results.get(entry["same_as"])
+                if result is None:
                     continue
-                for file_path in file_paths:
-                    folder = file_path.parent
-                    if folder not in seen:
-                        seen.add(folder)
-                        for arch, inst_type in get_installers(folder):
-                            if (arch.lower() != "neutral") and ((platform.machine().lower() in ("arm", "arm64")) != (arch.lower() in ("arm", "arm64"))):
-                                # Skip arm if machine is not arm-based (and otherwise)
-                                # Neutral should always pass (aka is not supposed to get into this scope)
-                                continue
-                            args = []
-                            label = []
-                            if arch:
-                                args.append(f"-a {arch}")
-                                label.append(arch)
-                            if inst_type:
-                                args.append(f"--installer-type {inst_type}")
-                                label.append(inst_type)
-                            result = test_install(folder, " ".join(args))
-                            pkg_label = f"{folder}" + (f" ({', '.join(label)})" if label else "")
-                            _print(f"\nFolder: {pkg_label}")
-                            _print(f"Install succeed: {result['INST']}")
-                            _print(f"Uninstall succeed: {result['UNINST']}")
-                            if os.getenv("GITHUB_ACTIONS"):
-                                if not result["INST"]:
-                                    print(f"::warning title=Install failed::{pkg_label}")
-                                elif not result["UNINST"]:
-                                    print(f"::warning title=Uninstall failed::{pkg_label}")
+                same_as = TestPlan.label(plan["entries"][entry["same_as"]])
+            else:
+                start = time.monotonic()
+                result = test_install(Path(entry["folder"]), TestPlan.winget_args(entry))
+                seconds = time.monotonic() - start
+                result = {"install": result["INST"], "uninstall": result["UNINST"]}
+                same_as = None
+            record = results[index] = {
+                "run": run,
+                "folder": entry["folder"],
+                "architecture": entry["architecture"],
+                "installer_type": entry["installer_type"],
+                "label": pkg_label,
+                "install": result["install"],
+                "uninstall": result["uninstall"],
+                "same_as": same_as,
+                "seconds": None if seconds is None else round(seconds, 1),
+                "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            }
+            TestPlan.append_result(record)
+            _records.append(record)
+            if os.getenv("GITHUB_ACTIONS"):
+                if not record["install"]:
+                    print(f"::warning title=Install failed::{pkg_label}")
+                elif not record["uninstall"]:
+                    print(f"::warning title=Uninstall failed::{pkg_label}")
     except KeyboardInterrupt:
         traceback.print_exc()
 
@@ -313,6 +292,14 @@ if __name__ == "__main__":
         if "--no-pp" in sys.argv:
             os.environ["NO_PP"] = "true"
             sys.argv.remove("--no-pp")
+        if "--resume" in sys.argv:
+            os.environ["TEST_RESUME"] = "true"
+            sys.argv.remove("--resume")
+        for flag, env in (("--plan", "TEST_PLAN"), ("--from-plan", "TEST_FROM_PLAN"), ("--shard", "TEST_SHARD"), ("--results", "TEST_RESULTS")):
+            if flag in sys.argv:
+                index = sys.argv.index(flag)
+                os.environ[env] = sys.argv[index + 1]
+                del sys.argv[index:index + 2]
         main(sys.argv[1:])
         if os.getenv("NO_SS", "0").lower() in ("true", "1"):
-            shutil.rmtree(ss_dir)
+            shutil.rmtree(ss_dir, ignore_errors=True)
@@ -3,104 +3,398 @@ import sys
 import uuid
 import yaml
 import regex
+import json
+import time
+import random
 import hashlib
-import platform
-import requests
+import difflib
 import tempfile
+import threading
 from glob import glob
 from pathlib import Path
-from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from urllib.parse import urlsplit
+from email.utils import parsedate_to_datetime
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 
-def extract_urls_from_file(file_path):
-    """Extract all URLs from a YAML file (raw text scan)"""
+import HttpClient
+import ManifestIndex
+import GitHubReleases
+import ManifestText
+import InstallerStore
+
+CHUNK_SIZE = 1 << 16
+CACHE_FILE = Path(__file__).parent / ".cache" / "links.json"
+
+class HostPool:
+    """Thread pool capping concurrent checks both globally and per host"""
+    def __init__(self, max_workers, per_host):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.per_host = per_host
+        self.lock = threading.Lock()
+        self.active = defaultdict(int)
+        self.waiting = defaultdict(deque)
+    
+    def submit(self, url, fn, *args):
+        host = urlsplit(url).hostname or ""
+        future = Future()
+        with self.lock:
+            if self.active[host] >= self.per_host:
+                # Host is saturated, start it once one of its slots frees up
+                self.waiting[host].append((future, fn, args))
+                return future
+            self.active[host] += 1
+        self._start(host, future, fn, args)
+        return future
+    
+    def _start(self, host, future, fn, args):
+        if not future.set_running_or_notify_cancel():
+            return self._release(host)
+        inner = self.executor.submit(fn, *args)
+        inner.add_done_callback(lambda f: self._done(host, future, f))
+    
+    def _done(self, host, future, inner):
+        self._release(host)
+        if inner.exception() is not None:
+            future.set_exception(inner.exception())
+        else:
+            future.set_result(inner.result())
+    
+    def _release(self, host):
+        with self.lock:
+            if not self.waiting[host]:
+                self.active[host] -= 1
+                return
+            queued = self.waiting[host].popleft()
+        self._start(host, *queued)
+    
+    def shutdown(self):
+        with self.lock:
+            for queue in self.waiting.values():
+                for future, _, _ in queue:
+                    future.cancel()
+                queue.clear()
+        self.executor.shutdown(cancel_futures=True)
+
+class HostHealth:
+    """Per-host circuit breaker that also keeps count of retries and time lost to each host"""
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.failures = defaultdict(int)
+        self.open_until = {}
+        self.stats = defaultdict(lambda: {"retries": 0, "lost": 0.0, "trips": 0})
+    
+    @classmethod
+    def from_env(cls):
+        return cls(
+            threshold=int(os.getenv("LINKS_BREAKER_THRESHOLD", "5")),
+            cooldown=float(os.getenv("LINKS_BREAKER_COOLDOWN", "60")),
+        )
+    
+    def is_open(self, host):
+        with self.lock:
+            return time.monotonic() < self.open_until.get(host, 0)
+    
+    def allow(self, host):
+        """Whether a request to host may go out, letting a single probe through once the cooldown ends"""
+        with self.lock:
+            until = self.open_until.get(host)
+            if until is None:
+                return True
+            if time.monotonic() < until:
+                return False
+            # Half-open: keep failing fast for the others while this probe runs
+            self.open_until[host] = time.monotonic() + self.cooldown
+            return True
+    
+    def record(self, host, failed, elapsed):
+        with self.lock:
+            if not failed:
+                self.failures[host] = 0
+                self.open_until.pop(host, None)
+                return
+            self.failures[host] += 1
+            self.stats[host]["lost"] += elapsed
+            if self.failures[host] >= self.threshold and host not in self.open_until:
+                self.open_until[host] = time.monotonic() + self.cooldown
+                self.stats[host]["trips"] += 1
+    
+    def retried(self, host, delay):
+        with self.lock:
+            self.stats[host]["retries"] += 1
+            self.stats[host]["lost"] += delay
+
+class LinkCache:
+    """On-disk cache of verified hashes keyed by URL, with the validators they were fetched with"""
+    def __init__(self, path, ttl, max_entries, refresh=False):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.refresh = refresh
+        self.lock = threading.Lock()
+        try:
+            self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self.entries = {}
+    
+    @staticmethod
+    def validators(response):
+        return {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "length": response.headers.get("Content-Length"),
+        }
+    
+    def get(self, url):
+        """Get a still fresh entry for url, unless a full re-verify was requested"""
+        if self.refresh:
+            return None
+        with self.lock:
+            entry = self.entries.get(url)
+        if entry and time.time() - entry["verified"] < self.ttl:
+            return entry
+        return None
+    
+    def put(self, url, response, sha256):
+        with self.lock:
+            self.entries[url] = {**self.validators(response), "sha256": sha256, "verified": time.time()}
+    
+    def unchanged(self, entry, response):
+        """Check whether response still carries the fingerprint the entry was verified with"""
+        current = self.validators(response)
+        if entry["length"] and current["length"] and entry["length"] != current["length"]:
+            return False
+        if entry["etag"] and current["etag"]:
+            # Weak validators don't guarantee identical bytes
+            return not entry["etag"].startswith("W/") and entry["etag"] == current["etag"]
+        return bool(entry["last_modified"] and entry["length"]) and (entry["last_modified"], entry["length"]) == (current["last_modified"], current["length"])
+    
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+    
+    def save(self):
+        """Write the cache back, dropping expired entries and the oldest ones above max_entries
+
+        Entries written by other checks since this cache was loaded are merged in, newest verify wins.
+        """
+        now = time.time()
+        with _save_lock:
+            try:
+                on_disk = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                on_disk = {}
+            with self.lock:
+                for url, entry in on_disk.items():
+                    if url not in self.entries or self.entries[url]["verified"] < entry["verified"]:
+                        self.entries[url] = entry
+                entries = sorted(
+                    ((url, entry) for url, entry in self.entries.items() if now - entry["verified"] < self.ttl),
+                    key=lambda item: item[1]["verified"],
+                    reverse=True,
+                )
+                self.entries = dict(entries[:self.max_entries])
+                data = json.dumps(self.entries, indent=1)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(f"{self.path.name}.{uuid.uuid4().hex}.tmp")
+            tmp_path.write_text(data, encoding="utf-8")
+            os.replace(tmp_path, self.path)
+
+# One LinkCache per file for the whole process, concurrent check_links calls share it
+_caches = {}
+_caches_lock = threading.Lock()
+_save_lock = threading.Lock()
+
+def shared_cache(path, ttl, max_entries, refresh=False):
+    key = (str(Path(path).resolve()), refresh)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = LinkCache(path, ttl, max_entries, refresh)
+        cache.ttl, cache.max_entries = ttl, max_entries
+        return cache
+
+URL_PATTERN = regex.compile(r"https?://[^\s'\"<>]+")
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+def scan_file(file_path):
+    """Extract all URLs from a YAML file (raw text scan) and the expected hash of each installer URL"""
     text = Path(file_path).read_text(encoding="utf-8", errors="ignore")
-    url_pattern = regex.compile(r"https?://[^\s'\"<>]+")
-    return url_pattern.findall(text)
+    urls = URL_PATTERN.findall(text)
+    hashes = defaultdict(list)
+    if file_path.name.endswith((".installer.yml", ".installer.yaml")):
+        data = yaml.load(text, Loader=YAML_LOADER) or {}
+        for installer in data.get("Installers", []):
+            if installer.get("InstallerUrl"):
+                hashes[installer["InstallerUrl"]].append(str(installer.get("InstallerSha256")).upper())
+    return urls, hashes
 
-def sha256sum(data):
-    """Compute SHA256 hash of given bytes"""
+def sha256sum(chunks, *sinks):
+    """Compute SHA256 hash of given byte chunks, teeing them into sinks"""
     sha256 = hashlib.sha256()
-    sha256.update(data)
+    for chunk in chunks:
+        sha256.update(chunk)
+        for sink in sinks:
+            sink.write(chunk)
     return sha256.hexdigest()
 
-def check_hash(file_path, url, response):
-    """Checks in installer.yml has installers hash match"""
-    if file_path.name.endswith((".installer.yml", ".installer.yaml")):
-        with open(file_path.resolve(), "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-        installers = data.get("Installers", [])
-        for installer in installers:
-            if url != installer.get("InstallerUrl"):
-                continue
-            actual = sha256sum(response.content).upper()
-            expected = installer.get("InstallerSha256").upper()
-            print(f"Expected: {expected}")
-            print(f"Actual:   {actual}")
-            if actual == expected:
-                print("Installer hash match!")
-            else:
-                print("Installer hash mismatch!")
+def check_hash(expected, response, result, *sinks):
+    """Checks installer hashes from installer.yml match the response body"""
+    sinks = [sink for sink in sinks if sink is not None]
+    if not response.ok:
+        expected = []
+    if not expected and not sinks:
+        return None
+    # Stream the body in chunks so memory stays flat regardless of installer size
+    actual = sha256sum(response.iter_content(CHUNK_SIZE), *sinks).upper()
+    for each in expected:
+        result.setdefault("hashes", []).append((each, actual))
+    return actual if expected else None
 
+def cached_hash(expected, sha256, result):
+    """Checks installer hashes from installer.yml match a previously verified hash"""
+    for each in expected:
+        result.setdefault("hashes", []).append((each, sha256))
+
+@contextmanager
 def dump_response(prefix, response):
-    """Dump response to %TEMP% with random filename"""
+    """Dump response to %TEMP% with random filename, yields the body file to stream into"""
     # If WITH_DUMP is true and we're not in CI and args being only "manifests"
-    if os.getenv("WITH_DUMP", "0").lower() in ("true", "1") and not os.getenv("GITHUB_ACTIONS") and sys.argv[1] != "manifests":
-        temp_dir = Path(tempfile.gettempdir())
-        base_name = f"{prefix}_{uuid.uuid4().hex}"
-        body_file = temp_dir / f"{base_name}.bin"
-        meta_file = temp_dir / f"{base_name}.meta"
-        
-        # Write response body
-        try:
-            with open(body_file, "wb") as f:
-                f.write(response.content)
-        except Exception as e:
-            print(f"Failed to write body file: {e}")
-        
-        # Write response metadata
-        try:
-            with open(meta_file, "w", encoding="utf-8") as f:
-                f.write(f"URL: {response.url}\n")
-                f.write(f"Status: {response.status_code}\n")
-                f.write("Headers:\n")
-                for k, v in response.headers.items():
-                    f.write(f"  {k}: {v}\n")
-        except Exception as e:
-            print(f"Failed to write meta file: {e}")
-
-def test_links(url, file_path):
-    """Test a URL with HEAD and GET requests"""
-    result = {"url": url}
+    if not (os.getenv("WITH_DUMP", "0").lower() in ("true", "1") and not os.getenv("GITHUB_ACTIONS") and sys.argv[1:2] != ["manifests"]):
+        yield None
+        return
+    temp_dir = Path(tempfile.gettempdir())
+    base_name = f"{prefix}_{uuid.uuid4().hex}"
+    body_file = temp_dir / f"{base_name}.bin"
+    meta_file = temp_dir / f"{base_name}.meta"
+    
+    # Write response metadata
+    try:
+        with open(meta_file, "w", encoding="utf-8") as f:
+            f.write(f"URL: {response.url}\n")
+            f.write(f"Status: {response.status_code}\n")
+            f.write("Headers:\n")
+            for k, v in response.headers.items():
+                f.write(f"  {k}: {v}\n")
+    except Exception as e:
+        print(f"Failed to write meta file: {e}")
+    
+    # Write response body
+    try:
+        f = open(body_file, "wb")
+    except Exception as e:
+        print(f"Failed to write body file: {e}")
+        yield None
+        return
+    with f:
+        yield f
+
+def test_links(url, expected=(), cache=None, store=False):
+    """Test a URL with HEAD and GET requests, keeping installers in the local store if asked to"""
+    result = {"url": url, "error": None, "cached": False}
+    entry = cache.get(url) if cache and expected else None
     timeout = (5, 10)
-    headers = {
-        "User-Agent": (
-            f"Python/{'.'.join((platform.python_version_tuple()[:2]))} "
-            f"(Windows NT {(v := sys.getwindowsversion()).major}.{v.minor}; "
-            f"{'Win64; x64' if platform.machine() == 'AMD64' else platform.machine()})"
-        )
-    }
+    start = time.perf_counter()
     try:
-        resp = requests.head(url, timeout=timeout, headers=headers, allow_redirects=True)
+        resp = HttpClient.head(url, timeout=timeout, allow_redirects=True)
         result["HEAD"] = str(resp.status_code)
-        dump_response("HEAD", resp)
+        result["head_status"] = resp.status_code
+        with dump_response("HEAD", resp):
+            pass
         result["HEAD"] += " (NOK)" if not resp.ok else ""
+        if entry and resp.ok and cache.unchanged(entry, resp):
+            # Same fingerprint as the last verified download, no need to fetch it again
+            result["GET"] = "Cached (unchanged)"
+            result["cached"] = True
+            cached_hash(expected, entry["sha256"], result)
+            return result
+        digest = GitHubReleases.asset_digest(url) if cache and not cache.refresh and expected and not store and resp.ok else None
+        if digest and all(str(each).upper() == digest for each in expected):
+            # GitHub already publishes the hash of release assets, no need to download them
+            result["GET"] = "Digest (release metadata)"
+            result["cached"] = True
+            cached_hash(expected, digest, result)
+            return result
     except Exception as e:
         result["HEAD"] = f"Error: {e}"
+        result["error"] = type(e).__name__
+    finally:
+        result["head_ms"] = round((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
     try:
-        resp = requests.get(url, timeout=timeout, headers=headers, allow_redirects=True)
-        result["GET"] = str(resp.status_code)
-        if resp.ok:
-            check_hash(file_path, url, resp)
-        dump_response("GET", resp)
-        result["GET"] += " (NOK)" if not resp.ok else ""
+        conditional = cache.conditional_headers(entry) if entry else {}
+        with HttpClient.get(url, timeout=timeout, headers=conditional, allow_redirects=True, stream=True) as resp:
+            result["GET"] = str(resp.status_code)
+            result["get_status"] = resp.status_code
+            if entry and resp.status_code == 304:
+                result["GET"] += " (cached)"
+                result["cached"] = True
+                cached_hash(expected, entry["sha256"], result)
+                return result
+            with dump_response("GET", resp) as sink, ExitStack() as stack:
+                writer = stack.enter_context(InstallerStore.Writer()) if store and expected and resp.ok else None
+                actual = check_hash(expected, resp, result, sink, writer)
+                if writer:
+                    writer.commit(url)
+            if cache and actual:
+                cache.put(url, resp, actual)
+            if actual:
+                result["last_modified"] = resp.headers.get("Last-Modified")
+            result["GET"] += " (NOK)" if not resp.ok else ""
     except Exception as e:
         result["GET"] = f"Error: {e}"
+        result["error"] = result["error"] or type(e).__name__
+    finally:
+        result["get_ms"] = round((time.perf_counter() - start) * 1000)
     return result
 
-def main(paths):
-    seen = set()
-    fails = defaultdict(int)
-    max_retries = 3
+def print_result(file_path, result):
+    """Print a check result as a File:/URL:/HEAD:/GET: block"""
+    print(f"\nFile: {file_path}")
+    print(f"URL:  {result['url']}")
+    for expected, actual in result.get("hashes", []):
+        print(f"Expected: {expected}")
+        print(f"Actual:   {actual}")
+        if actual == expected:
+            print("Installer hash match!")
+        else:
+            print("Installer hash mismatch!")
+    print(f"HEAD: {result['HEAD']}")
+    print(f"GET:  {result['GET']}")
+    if result.get("retries"):
+        print(f"Retries: {result['retries']}")
+
+def to_record(file_path, result):
+    """Turn a check result into a JSON serializable record"""
+    hashes = result.get("hashes", [])
+    actual = hashes[0][1] if hashes else None
+    return {
+        "file": str(file_path),
+        "url": result["url"],
+        "head": result.get("HEAD"),
+        "get": result.get("GET"),
+        "head_status": result.get("head_status"),
+        "get_status": result.get("get_status"),
+        "head_ms": result.get("head_ms"),
+        "get_ms": result.get("get_ms"),
+        "cached": result["cached"],
+        "expected": [expected for expected, _ in hashes],
+        "actual": actual,
+        "match": all(expected == actual for expected, _ in hashes) if hashes else None,
+        "error": result["error"],
+        "retries": result.get("retries", 0),
+    }
+
+def collect_files(paths):
+    """Resolve path arguments (globs, folders, files) into YAML files"""
     sort_key = lambda p: (
         2 if ".installer." in p.name.lower()
         else 1 if ".locale." in p.name.lower()
@@ -124,34 +418,191 @@ def main(paths):
             if not path.exists():
                 print(f"Path doesn't exist: {path}")
             if path.is_file() and path.suffix.lower() in [".yml", ".yaml"]:
-                file_paths = [path]
+                yield path
             elif path.is_dir():
-                file_paths = sorted(path.rglob("*.y*ml"), key=sort_key)
-            else:
-                continue
-            for file_path in file_paths:
-                urls = extract_urls_from_file(file_path)
-                for url in urls:
-                    if url not in seen:
-                        seen.add(url)
-                        print(f"\nFile: {file_path}")
-                        print(f"URL:  {url}")
-                        result = test_links(url, file_path)
-                        print(f"HEAD: {result['HEAD']}")
-                        print(f"GET:  {result['GET']}")
-                        if any(str(result[i]).startswith("Error:") for i in ("HEAD", "GET")):
-                            fails[url] += 1
-                            if fails[url] < max_retries:
-                                seen.discard(url)
+                yield from sorted(ManifestIndex.files(path), key=sort_key)
+
+def is_failed(result):
+    return any(str(result[method]).startswith("Error:") for method in ("HEAD", "GET"))
+
+def submit_check(pool, health, url, expected, cache, store, max_attempts, backoff):
+    """Check url on the pool, re-queueing errors with exponential backoff and jitter"""
+    host = urlsplit(url).netloc
+    future = Future()
+    
+    def attempt(n):
+        if not health.allow(host):
+            message = f"Error: Circuit open for {host}"
+            return finish({"url": url, "HEAD": message, "GET": message, "error": "CircuitOpen", "cached": False}, n)
+        try:
+            inner = pool.submit(url, test_links, url, expected, cache, store)
+        except RuntimeError as e:
+            # Pool already shut down
+            return future.set_exception(e)
+        inner.add_done_callback(lambda f: done(f, n))
+    
+    def done(inner, n):
+        if inner.exception() is not None:
+            return future.set_exception(inner.exception())
+        result = inner.result()
+        failed = is_failed(result)
+        health.record(host, failed, (result.get("head_ms", 0) + result.get("get_ms", 0)) / 1000)
+        if failed and n < max_attempts and not health.is_open(host):
+            delay = backoff * 2 ** (n - 1) + random.uniform(0, backoff)
+            health.retried(host, delay)
+            timer = threading.Timer(delay, attempt, args=(n + 1,))
+            timer.daemon = True
+            timer.start()
+        else:
+            finish(result, n)
+    
+    def finish(result, n):
+        result["retries"] = n - 1
+        future.set_result(result)
+    
+    attempt(1)
+    return future
+
+def check_links(paths, health=None, store=None):
+    """Check every URL found under paths, yielding (file_path, result) in file order"""
+    jobs = int(os.getenv("LINKS_JOBS", "8"))
+    per_host = int(os.getenv("LINKS_PER_HOST", "4"))
+    cache = None
+    if os.getenv("NO_CACHE", "0").lower() not in ("true", "1"):
+        cache = shared_cache(
+            os.getenv("LINKS_CACHE", CACHE_FILE),
+            ttl=float(os.getenv("LINKS_CACHE_TTL", "7")) * 86400,
+            max_entries=int(os.getenv("LINKS_CACHE_SIZE", "20000")),
+            refresh=os.getenv("REFRESH_CACHE", "0").lower() in ("true", "1"),
+        )
+    max_attempts = int(os.getenv("LINKS_RETRIES", "3"))
+    backoff = float(os.getenv("LINKS_BACKOFF", "2"))
+    health = health or HostHealth.from_env()
+    if store is None:
+        store = os.getenv("USE_STORE", "0").lower() in ("true", "1")
+    
+    # First occurrence of every URL, in output order
+    checks = {}
+    for file_path in collect_files(paths):
+        urls, hashes = scan_file(file_path)
+        for url in urls:
+            checks.setdefault(url, (file_path, hashes.get(url, [])))
+    
+    pool = HostPool(max(jobs, 1), max(per_host, 1))
+    pending = []
+    try:
+        for url, (file_path, expected) in checks.items():
+            pending.append((file_path, submit_check(pool, health, url, expected, cache, store, max(max_attempts, 1), backoff)))
+        for file_path, future in pending:
+            yield file_path, future.result()
+    finally:
+        pool.shutdown()
+        if cache:
+            cache.save()
+            GitHubReleases.save_cache()
+
+def release_date(last_modified):
+    try:
+        return parsedate_to_datetime(last_modified).date().isoformat()
+    except (TypeError, ValueError):
+        return None
+
+def fix_manifests(paths, results, dry_run=False, out=sys.stdout):
+    """Write the hashes just downloaded into every installer manifest under paths that still has the old ones
+
+    ReleaseDate follows the Last-Modified of the changed installers when the manifest has one.
+    Returns the files that were (or with dry_run would be) changed.
+    """
+    new_hashes = {}
+    dates = {}
+    for result in results:
+        hashes = result.get("hashes", [])
+        if not hashes or all(expected == actual for expected, actual in hashes):
+            continue
+        new_hashes[result["url"]] = hashes[0][1]
+        dates[result["url"]] = release_date(result.get("last_modified"))
+    fixed = []
+    if not new_hashes:
+        return fixed
+    for file_path in collect_files(paths):
+        if not file_path.name.endswith((".installer.yml", ".installer.yaml")):
+            continue
+        text = ManifestText.read(file_path)
+        new_text, changed = ManifestText.set_installer_hashes(text, new_hashes)
+        if not changed:
+            continue
+        date = max((dates[url] for url in changed if dates.get(url)), default=None)
+        if date and ManifestText.get_scalar(new_text, "ReleaseDate", top_level=True):
+            new_text = ManifestText.set_scalar(new_text, "ReleaseDate", date, top_level=True)
+        fixed.append(file_path)
+        if dry_run:
+            out.writelines(difflib.unified_diff(
+                text.splitlines(keepends=True), new_text.splitlines(keepends=True),
+                f"a/{file_path.as_posix()}", f"b/{file_path.as_posix()}",
+            ))
+        else:
+            ManifestText.write(file_path, new_text)
+    print(f"{'Would fix' if dry_run else 'Fixed'} {len(fixed)} manifest(s)", file=out)
+    return fixed
+
+def print_summary(health):
+    """Print retries and time lost per host, if any"""
+    if not health.stats:
+        return
+    print("\nRetry summary:")
+    for host, stats in sorted(health.stats.items(), key=lambda item: -item[1]["lost"]):
+        print(f"  {host}: {stats['retries']} retries, {stats['lost']:.1f}s lost, circuit opened {stats['trips']} time(s)")
+
+def main(paths):
+    as_json = os.getenv("LINKS_JSON", "0").lower() in ("true", "1")
+    dry_run = os.getenv("LINKS_DRY_RUN", "0").lower() in ("true", "1")
+    fix = dry_run or os.getenv("LINKS_FIX", "0").lower() in ("true", "1")
+    health = HostHealth.from_env()
+    results = []
+    for file_path, result in check_links(paths, health):
+        if fix:
+            results.append(result)
+        if as_json:
+            print(json.dumps(to_record(file_path, result)), flush=True)
+        else:
+            print_result(file_path, result)
+    if not as_json:
+        print_summary(health)
+    if fix:
+        # Keep stdout pure JSON lines in --json mode
+        fix_manifests(paths, results, dry_run, sys.stderr if as_json else sys.stdout)
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         if os.getenv("GITHUB_ACTIONS"):
             print("Nothing to do, exiting...")
         else:
-            print(f"Usage: {Path(sys.executable).with_suffix('').name} {os.path.basename(sys.argv[0])} <directory>")
+            print(f"Usage: {Path(sys.executable).with_suffix('').name} {os.path.basename(sys.argv[0])} <directory> [--jobs N] [--per-host N] [--no-cache] [--refresh] [--json] [--store] [--fix] [--dry-run]")
     else:
         if "--with-dump" in sys.argv:
             os.environ["WITH_DUMP"] = str(True)
             sys.argv.remove("--with-dump")
+        if "--json" in sys.argv:
+            os.environ["LINKS_JSON"] = str(True)
+            sys.argv.remove("--json")
+        if "--store" in sys.argv:
+            os.environ["USE_STORE"] = str(True)
+            sys.argv.remove("--store")
+        if "--no-cache" in sys.argv:
+            os.environ["NO_CACHE"] = str(True)
+            sys.argv.remove("--no-cache")
+        if "--refresh" in sys.argv:
+            os.environ["REFRESH_CACHE"] = str(True)
+            sys.argv.remove("--refresh")
+        if "--fix" in sys.argv:
+            os.environ["LINKS_FIX"] = str(True)
+            sys.argv.remove("--fix")
+        if "--dry-run" in sys.argv:
+            os.environ["LINKS_DRY_RUN"] = str(True)
+            sys.argv.remove("--dry-run")
+        for flag, env in (("--jobs", "LINKS_JOBS"), ("--per-host", "LINKS_PER_HOST")):
+            if flag in sys.argv:
+                i = sys.argv.index(flag)
+                os.environ[env] = sys.argv[i + 1]
+                del sys.argv[i:i + 2]
         main(sys.argv[1:])
@@ -0,0 +1,261 @@
+import os
+import sys
+import json
+import heapq
+import platform
+from glob import glob
+from pathlib import Path
+from datetime import datetime, timezone
+
+import ManifestIndex
+
+PLAN_VERSION = 1
+RESULTS_FILE = Path(__file__).parent / ".cache" / "install_results.jsonl"
+DEFAULT_DURATION = 300
+KEEP_RESULTS = 5
+
+def resolve(paths):
+    """Installer entries of every version folder of the given paths/globs, as {folder: installers}
+
+    Folders come from the manifest index: one refresh and one query per path.
+    """
+    folders = {}
+    for path_raw in paths:
+        paths_resolved = glob(path_raw)
+        if not paths_resolved:
+            if "*" in path_raw:
+                parts = path_raw.rsplit("\\", 1)
+                if len(parts) == 2:
+                    path_raw_rs = str(Path(parts[0]) / "**" / parts[1])
+                    paths_resolved = glob(path_raw_rs, recursive=True)
+        if not paths_resolved:
+            print(f"Path doesn't exist: {path_raw}")
+            continue
+        for path_each in paths_resolved:
+            path = Path(path_each)
+            if not path.exists():
+                print(f"Path doesn't exist: {path}")
+            if path.is_file() and path.suffix.lower() in [".yml", ".yaml"]:
+                if path.parent not in folders:
+                    folders[path.parent] = ManifestIndex.folder_installers(path.parent).get(path.parent, [])
+            elif path.is_dir():
+                for folder, installers in ManifestIndex.folder_installers(path).items():
+                    folders.setdefault(folder, installers)
+    return folders
+
+def is_arm(arch):
+    return (arch or "").lower() in ("arm", "arm64")
+
+def runs_on(arch, machine):
+    """Whether an installer of arch can be tested on machine, neutral ones run everywhere"""
+    # Skip arm if machine is not arm-based (and otherwise)
+    return (arch or "").lower() == "neutral" or is_arm(machine) == is_arm(arch)
+
+def folder_pairs(installers):
+    """(architecture, installer type, hashes) of a folder's installers, portable installer types sorted last"""
+    pairs = {}
+    for inst in installers:
+        arch = inst["architecture"]
+        inst_type = inst["installer_type"]
+        is_portable = (
+            inst_type == "portable"
+            or inst["nested_installer_type"] == "portable"
+        )
+        hashes = pairs.setdefault((arch, inst_type, is_portable), set())
+        hashes.add(inst["sha256"])
+    return [
+        (arch, inst_type, hashes)
+        for (arch, inst_type, _), hashes in sorted(
+            pairs.items(),
+            key=lambda x: (x[0][2], x[0][1] or "", x[0][0] or "")
+        )
+    ]
+
+def label(entry):
+    parts = [part for part in (entry["architecture"], entry["installer_type"]) if part]
+    return entry["folder"] + (f" ({', '.join(parts)})" if parts else "")
+
+def winget_args(entry):
+    args = []
+    if entry["architecture"]:
+        args.append(f"-a {entry['architecture']}")
+    if entry["installer_type"]:
+        args.append(f"--installer-type {entry['installer_type']}")
+    return " ".join(args)
+
+def build(paths, machine=None):
+    """Test matrix of paths: every (folder, architecture, installer type) pair, with the ones
+    sharing installer binaries with an earlier pair marked as duplicates of it"""
+    machine = machine or platform.machine()
+    entries = []
+    first_of = {}
+    for folder, installers in resolve(paths).items():
+        for arch, inst_type, hashes in folder_pairs(installers):
+            entry = {
+                "folder": str(folder),
+                "architecture": arch,
+                "installer_type": inst_type,
+                "sha256": sorted(hashes - {None}),
+                "skip": None,
+                "same_as": None,
+            }
+            if not runs_on(arch, machine):
+                entry["skip"] = "architecture"
+            elif entry["sha256"] and None not in hashes:
+                # Same binaries installed the same way give the same result
+                key = (inst_type, tuple(entry["sha256"]))
+                if key in first_of:
+                    entry["skip"] = "duplicate"
+                    entry["same_as"] = first_of[key]
+                else:
+                    first_of[key] = len(entries)
+            entries.append(entry)
+    return {
+        "version": PLAN_VERSION,
+        "machine": machine,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "entries": entries,
+    }
+
+def save(plan, path):
+    Path(path).write_text(json.dumps(plan, indent=2), encoding="utf-8")
+
+def load(path):
+    plan = json.loads(Path(path).read_text(encoding="utf-8"))
+    if plan.get("version") != PLAN_VERSION:
+        raise RuntimeError(f"Unsupported plan version in {path}: {plan.get('version')}")
+    return plan
+
+def summary(plan):
+    entries = plan["entries"]
+    runs = sum(entry["skip"] is None for entry in entries)
+    duplicates = sum(entry["skip"] == "duplicate" for entry in entries)
+    return f"{runs} to test, {duplicates} duplicate, {len(entries) - runs - duplicates} skipped on {plan['machine']}"
+
+def package_key(folder):
+    return ManifestIndex.key(Path(folder).parent)
+
+def estimate(entry, durations, fallback):
+    recent = durations.get(package_key(entry["folder"]))
+    return sum(recent) / len(recent) if recent else fallback
+
+def assign_shards(plan, count, durations=None):
+    """Split the entries to test into count shards of about the same expected duration,
+    longest first onto the least loaded shard; duplicates follow the entry they reuse"""
+    durations = load_durations(read_results()) if durations is None else durations
+    averages = sorted(sum(recent) / len(recent) for recent in durations.values() if recent)
+    # Packages never tested before count as a typical one
+    fallback = averages[len(averages) // 2] if averages else DEFAULT_DURATION
+    entries = plan["entries"]
+    costs = [(estimate(entry, durations, fallback), index) for index, entry in enumerate(entries) if entry["skip"] is None]
+    loads = [(0.0, shard) for shard in range(count)]
+    for cost, index in sorted(costs, key=lambda x: (-x[0], x[1])):
+        load, shard = heapq.heappop(loads)
+        entries[index]["shard"] = shard
+        heapq.heappush(loads, (load + cost, shard))
+    for entry in entries:
+        if entry["skip"] == "duplicate":
+            entry["shard"] = entries[entry["same_as"]]["shard"]
+        elif entry["skip"]:
+            entry["shard"] = None
+    plan["shards"] = [round(load) for load, _ in sorted(loads, key=lambda x: x[1])]
+    return plan
+
+def parse_shard(value):
+    """'i/N' (1-based) as (index, count)"""
+    index, count = map(int, value.split("/"))
+    if not 1 <= index <= count:
+        raise ValueError(f"Invalid shard {value}")
+    return index - 1, count
+
+def select_shard(plan, index):
+    """Skip every entry that belongs to another shard"""
+    for entry in plan["entries"]:
+        if entry["skip"] in (None, "duplicate") and entry.get("shard") != index:
+            entry["skip"] = "shard"
+    return plan
+
+def results_path():
+    return Path(os.getenv("TEST_RESULTS", RESULTS_FILE))
+
+def result_key(record):
+    return ManifestIndex.key(record["folder"]), record["architecture"], record["installer_type"]
+
+def read_results():
+    """Every outcome in the results file in order, a line cut short by a crash is ignored"""
+    records = []
+    try:
+        with open(results_path(), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    result_key(record)
+                except (ValueError, KeyError, TypeError):
+                    continue
+                records.append(record)
+    except OSError:
+        pass
+    return records
+
+def load_results():
+    """Id of the latest run and its outcomes by result key, to resume it"""
+    records = read_results()
+    run = records[-1].get("run") if records else None
+    if run is None:
+        return start_run(records), {}
+    return run, {result_key(record): record for record in records if record.get("run") == run}
+
+def start_run(records=None):
+    """Id of a new run, the file keeping only the last KEEP_RESULTS outcomes of every pair"""
+    records = read_results() if records is None else records
+    kept = {}
+    for record in records:
+        recent = kept.setdefault(result_key(record), [])
+        recent.append(record)
+        del recent[:-KEEP_RESULTS]
+    kept = {id(record) for recent in kept.values() for record in recent}
+    path = results_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text("".join(json.dumps(record) + "\n" for record in records if id(record) in kept), encoding="utf-8")
+    os.replace(tmp_path, path)
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+def load_durations(records):
+    """Recent install test durations in seconds per package folder, from the recorded outcomes"""
+    durations = {}
+    for record in records:
+        if record.get("seconds") is not None:
+            recent = durations.setdefault(package_key(record["folder"]), [])
+            recent.append(record["seconds"])
+            del recent[:-KEEP_RESULTS]
+    return durations
+
+def append_result(record):
+    """Add one outcome to the results file, on disk before the next test starts"""
+    path = results_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+if __name__ == "__main__":
+    machine = None
+    if "--machine" in sys.argv:
+        index = sys.argv.index("--machine")
+        machine = sys.argv[index + 1]
+        del sys.argv[index:index + 2]
+    shards = None
+    if "--shards" in sys.argv:
+        index = sys.argv.index("--shards")
+        shards = int(sys.argv[index + 1])
+        del sys.argv[index:index + 2]
+    plan = build(sys.argv[1:] or ["manifests"], machine)
+    if shards:
+        assign_shards(plan, shards)
+    print(json.dumps(plan, indent=2))
+    print(summary(plan), file=sys.stderr)
+    for index, seconds in enumerate(plan.get("shards", [])):
+        print(f"--shard {index + 1}/{shards}: ~{seconds}s", file=sys.stderr)
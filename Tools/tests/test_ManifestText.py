@@ -0,0 +1,62 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import ManifestText
+
+OLD = "0" * 64
+NEW_A = "a" * 64
+NEW_B = "b" * 64
+
+class SetInstallerHashesTest(unittest.TestCase):
+    def test_url_before_hash(self):
+        text = (
+            "Installers:\n"
+            "- Architecture: x86\n"
+            "  InstallerUrl: https://example.com/a.exe\n"
+            f"  InstallerSha256: {OLD}\n"
+            "- Architecture: x64\n"
+            "  InstallerUrl: https://example.com/b.exe\n"
+            f"  InstallerSha256: {OLD}\n"
+            "ManifestType: installer\n"
+        )
+        new_text, changed = ManifestText.set_installer_hashes(text, {"https://example.com/b.exe": NEW_B})
+        self.assertEqual(changed, ["https://example.com/b.exe"])
+        self.assertEqual(new_text, text.replace(f"x64\n  InstallerUrl: https://example.com/b.exe\n  InstallerSha256: {OLD}", f"x64\n  InstallerUrl: https://example.com/b.exe\n  InstallerSha256: {NEW_B.upper()}"))
+
+    def test_hash_before_url(self):
+        # Each hash belongs to the URL of its own item, not to the URL seen last
+        text = (
+            "Installers:\r\n"
+            f"- InstallerSha256: {OLD}\r\n"
+            "  InstallerUrl: https://example.com/a.exe\r\n"
+            "- Architecture: x64\r\n"
+            f"  InstallerSha256: {OLD}\r\n"
+            "  InstallerUrl: https://example.com/b.exe\r\n"
+            "ManifestType: installer\r\n"
+        )
+        new_text, changed = ManifestText.set_installer_hashes(text, {"https://example.com/a.exe": NEW_A})
+        self.assertEqual(changed, ["https://example.com/a.exe"])
+        self.assertEqual(new_text.splitlines(keepends=True)[1], f"- InstallerSha256: {NEW_A.upper()}\r\n")
+        self.assertEqual(new_text.splitlines(keepends=True)[4], f"  InstallerSha256: {OLD}\r\n")
+
+    def test_item_without_hash(self):
+        # Nested lists stay inside the item, a URL never carries over into the next one
+        text = (
+            "Installers:\n"
+            "- InstallerUrl: https://example.com/a.zip\n"
+            "  NestedInstallerFiles:\n"
+            "  - RelativeFilePath: a.exe\n"
+            "- InstallerUrl: https://example.com/b.zip\n"
+            f"  InstallerSha256: {OLD}\n"
+        )
+        new_text, changed = ManifestText.set_installer_hashes(text, {"https://example.com/a.zip": NEW_A})
+        self.assertEqual((new_text, changed), (text, []))
+        new_text, changed = ManifestText.set_installer_hashes(text, {"https://example.com/b.zip": NEW_B})
+        self.assertEqual(changed, ["https://example.com/b.zip"])
+        self.assertTrue(new_text.endswith(f"  InstallerSha256: {NEW_B.upper()}\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,166 @@
+import os
+import re
+import sys
+import struct
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+RESOURCE_OFFSET = 0x40000
+FILE_SIZE = 1 << 20
+
+def pad4(data):
+    return data + b"\0" * (-len(data) % 4)
+
+def version_node(key, value=b"", text=False, children=()):
+    """One VS_VERSIONINFO style node: header, key, value and children, each 4-byte aligned"""
+    data = pad4(b"\0" * 6 + key.encode("utf-16-le") + b"\0\0") + value
+    for child in children:
+        data = pad4(data) + child
+    value_length = len(value) // 2 if text else len(value)
+    return struct.pack("<HHH", len(data), value_length, 1 if text else 0) + data[6:]
+
+def string_node(name, value):
+    return version_node(name, (value + "\0").encode("utf-16-le"), text=True)
+
+def version_info(product_version, file_version):
+    """VS_VERSIONINFO with both the fixed info and a StringFileInfo table"""
+    fixed = struct.pack("<13I", 0xFEEF04BD, 0x10000, 0x00010002, 0x00030004, 0x00050006, 0x00070008, *[0] * 7)
+    table = version_node("040904b0", children=[
+        string_node("CompanyName", "Example"),
+        string_node("FileVersion", file_version),
+        string_node("ProductVersion", product_version),
+    ])
+    return version_node("VS_VERSION_INFO", fixed, children=[version_node("StringFileInfo", children=[table])])
+
+def build_pe(product_version="2.5.1 beta", file_version="2.5.1.0"):
+    """Smallest PE32 layout PeVersion walks: DOS/COFF/optional headers, one .rsrc section holding RT_VERSION"""
+    section_rva = 0x1000
+    info = version_info(product_version, file_version)
+    resources = b"".join([
+        struct.pack("<IIHHHH", 0, 0, 0, 0, 0, 1), struct.pack("<II", 16, 0x80000000 | 0x18),  # type RT_VERSION
+        struct.pack("<IIHHHH", 0, 0, 0, 0, 0, 1), struct.pack("<II", 1, 0x80000000 | 0x30),  # name 1
+        struct.pack("<IIHHHH", 0, 0, 0, 0, 0, 1), struct.pack("<II", 0x409, 0x48),  # language en-US
+        struct.pack("<IIII", section_rva + 0x58, len(info), 0, 0),
+    ]) + info
+
+    pe_offset = 0x80
+    dos = bytearray(pe_offset)
+    dos[:2] = b"MZ"
+    struct.pack_into("<I", dos, 0x3C, pe_offset)
+    coff = b"PE\0\0" + struct.pack("<HHIIIHH", 0x14C, 1, 0, 0, 0, 224, 0x102)
+    optional = bytearray(224)
+    struct.pack_into("<H", optional, 0, 0x10B)
+    struct.pack_into("<II", optional, 96 + 2 * 8, section_rva, len(resources))
+    section = b".rsrc\0\0\0" + struct.pack("<IIII", len(resources), section_rva, len(resources), RESOURCE_OFFSET) + b"\0" * 16
+
+    data = bytearray(FILE_SIZE)
+    headers = bytes(dos) + coff + bytes(optional) + section
+    data[:len(headers)] = headers
+    data[RESOURCE_OFFSET:RESOURCE_OFFSET + len(resources)] = resources
+    return bytes(data)
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Serves the sample PE at any path, honoring Range unless the path contains /norange/"""
+    protocol_version = "HTTP/1.1"
+    body = b""
+    requests = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        data = self.body
+        match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range") or "")
+        if match and "/norange/" not in self.path:
+            start, end = map(int, match.groups())
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                self.requests.append(416)
+                return
+            data = data[start:end + 1]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{start + len(data) - 1}/{len(self.body)}")
+        else:
+            self.send_response(200)
+        self.requests.append(206 if match and "/norange/" not in self.path else 200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class PeVersionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp = tempfile.TemporaryDirectory()
+        os.environ["INSTALLER_STORE"] = str(Path(cls.temp.name) / "store")
+        global PeVersion, InstallerStore
+        import PeVersion
+        import InstallerStore
+        RangeHandler.body = build_pe()
+        cls.path = Path(cls.temp.name) / "sample.exe"
+        cls.path.write_bytes(RangeHandler.body)
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.temp.cleanup()
+
+    def setUp(self):
+        RangeHandler.requests.clear()
+
+    def test_local_file(self):
+        info = PeVersion.version_info(self.path)
+        self.assertEqual(info["ProductVersion"], "2.5.1 beta")
+        self.assertEqual(info["FileVersion"], "2.5.1.0")
+        self.assertEqual(info["CompanyName"], "Example")
+
+    def test_fixed_versions(self):
+        data = PeVersion.version_resource(PeVersion.FileReader(self.path))
+        key, value, _, _ = PeVersion.parse_block(data, 0)
+        self.assertEqual(key, "VS_VERSION_INFO")
+        self.assertEqual(PeVersion.fixed_version(*struct.unpack_from("<II", value, 8)), "1.2.3.4")
+
+    def test_range_requests(self):
+        url = f"{self.base}/range/sample.exe"
+        reader = PeVersion.open_reader(url)
+        self.assertIsInstance(reader, PeVersion.RangeReader)
+        try:
+            self.assertEqual(PeVersion.parse_version_info(PeVersion.version_resource(reader))["ProductVersion"], "2.5.1 beta")
+            # Headers in the first block, resources in the block at RESOURCE_OFFSET
+            self.assertEqual(reader.fetched, 2 * PeVersion.BLOCK_SIZE)
+        finally:
+            reader.close()
+        self.assertEqual(set(RangeHandler.requests), {206})
+        self.assertIsNone(InstallerStore.lookup(url))
+
+    def test_full_download_fallback(self):
+        url = f"{self.base}/norange/sample.exe"
+        self.assertEqual(PeVersion.product_version(url), "2.5.1 beta")
+        self.assertEqual(RangeHandler.requests, [200])
+        # The full body was kept, a second lookup reads the stored copy
+        stored = InstallerStore.lookup(url)
+        self.assertIsNotNone(stored)
+        self.assertEqual(Path(stored).read_bytes(), RangeHandler.body)
+        self.assertEqual(PeVersion.product_version(url), "2.5.1 beta")
+        self.assertEqual(RangeHandler.requests, [200])
+
+    def test_not_a_pe(self):
+        path = Path(self.temp.name) / "not.exe"
+        path.write_bytes(b"ZM" + b"\0" * 128)
+        with self.assertRaises(ValueError):
+            PeVersion.version_info(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
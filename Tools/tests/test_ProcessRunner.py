@@ -0,0 +1,69 @@
+import sys
+import time
+import psutil
+import unittest
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+import ProcessRunner
+
+def python(code):
+    return [sys.executable, "-c", code]
+
+# Prints, starts a grandchild that outlives it unless killed, then hangs
+HANGING = """
+import sys, time, subprocess
+print("started", flush=True)
+child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+print(child.pid, flush=True)
+time.sleep(60)
+"""
+
+def gone(pid, wait=5):
+    """Whether pid exits (or is left a zombie) within wait seconds"""
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        try:
+            if psutil.Process(pid).status() == psutil.STATUS_ZOMBIE:
+                return True
+        except psutil.NoSuchProcess:
+            return True
+        time.sleep(0.1)
+    return False
+
+class ProcessRunnerTest(unittest.TestCase):
+    def test_output_newlines(self):
+        output = ProcessRunner.run(python(r"import sys; sys.stdout.buffer.write(b'a\r\nb\rc\nd')"), echo=False)
+        self.assertEqual(output, "a\nb\nc\nd")
+
+    def test_timeout_kills_tree(self):
+        start = time.monotonic()
+        with self.assertRaises(subprocess.TimeoutExpired) as raised:
+            ProcessRunner.run(python(HANGING), timeout=2, echo=False)
+        self.assertLess(time.monotonic() - start, 10)
+        started, pid = raised.exception.output.split()
+        self.assertEqual(started, "started")
+        self.assertTrue(gone(int(pid)))
+
+    def test_run_many(self):
+        start = time.monotonic()
+        results = ProcessRunner.run_many(
+            [python("import time; time.sleep(1); print(1)"), python("import sys; sys.exit(3)"), python("import time; time.sleep(1); print(2)")],
+            jobs=2,
+            echo=False,
+        )
+        self.assertEqual(results[0], "1\n")
+        self.assertIsInstance(results[1], subprocess.CalledProcessError)
+        self.assertEqual(results[2], "2\n")
+        # Two at a time: the failing one frees its slot right away
+        self.assertLess(time.monotonic() - start, 1.9)
+
+    def test_run_many_timeout(self):
+        results = ProcessRunner.run_many([python("import time; time.sleep(30)"), python("print('ok')")], timeout=1, echo=False)
+        self.assertIsInstance(results[0], subprocess.TimeoutExpired)
+        self.assertEqual(results[1], "ok\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
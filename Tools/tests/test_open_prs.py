@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(ROOT / "Tools"))
+sys.path.insert(0, str(ROOT / "update" / "auto"))
+
+ITEMS = [{"number": 1000 + i, "title": f"New version: NirSoft.Tool{i} version 1.{i}"} for i in range(150)]
+ITEMS.append({"number": 5, "title": "Remove version: Foo.Bar"})
+
+class SearchHandler(BaseHTTPRequestHandler):
+    """Stand-in for GitHub's /search/issues, paged through Link headers; answers 500 when failing is set"""
+    protocol_version = "HTTP/1.1"
+    failing = False
+    queries = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        query = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        self.queries.append(query)
+        if self.failing:
+            self.send_response(500)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        page, per_page = int(query.get("page", 1)), int(query["per_page"])
+        body = json.dumps({"total_count": len(ITEMS), "items": ITEMS[(page - 1) * per_page:page * per_page]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        if page * per_page < len(ITEMS):
+            port = self.server.server_address[1]
+            self.send_header("Link", f'<http://127.0.0.1:{port}/search/issues?per_page={per_page}&page={page + 1}>; rel="next"')
+        self.end_headers()
+        self.wfile.write(body)
+
+class OpenPrsTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), SearchHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.env = mock.patch.dict(os.environ, {
+            "GITHUB_API_URL": f"http://127.0.0.1:{cls.server.server_address[1]}",
+            "PR_AUTHOR": "example-bot",
+        })
+        cls.env.start()
+        global _update_all
+        import _update_all
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.env.stop()
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        SearchHandler.failing = False
+        SearchHandler.queries.clear()
+        _update_all._open_prs = False
+        _update_all.submit_q.clear()
+
+    def test_fetch_all_pages(self):
+        found = _update_all.fetch_open_prs()
+        self.assertEqual(len(SearchHandler.queries), 2)
+        self.assertIn("author:example-bot", SearchHandler.queries[0]["q"])
+        self.assertIn("is:open", SearchHandler.queries[0]["q"])
+        self.assertEqual(found[("NirSoft.Tool3", "1.3")], [1003])
+        self.assertEqual(found[("NirSoft.Tool149", "1.149")], [1149])
+        self.assertEqual(len(found), 150)
+
+    def test_one_lookup_per_run(self):
+        self.assertEqual(_update_all.find_prs("manifests\\n\\NirSoft\\Tool3\\1.3"), [1003])
+        self.assertEqual(_update_all.find_prs("manifests/n/NirSoft/Tool7/1.7"), [1007])
+        self.assertEqual(_update_all.find_prs("manifests\\n\\NirSoft\\Tool7\\9.9"), [])
+        self.assertEqual(len(SearchHandler.queries), 2)
+
+    def test_fallback_per_folder(self):
+        SearchHandler.failing = True
+        calls = []
+        def fake_run(command, **kwargs):
+            calls.append(command)
+            return json.dumps([{"number": 42}] if command.endswith("1.3") else [])
+        with mock.patch.object(_update_all, "run_with_stream", fake_run):
+            self.assertEqual(_update_all.find_prs("manifests\\n\\NirSoft\\Tool3\\1.3"), [42])
+            self.assertEqual(_update_all.find_prs("manifests\\n\\NirSoft\\Tool4\\1.4"), [])
+        # The failed search is not retried, every folder goes through the script instead
+        self.assertEqual(len(SearchHandler.queries), 1)
+        self.assertIsNone(_update_all._open_prs)
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(all("Tools\\GitHubPRSearch.ps1 manifests\\n\\NirSoft\\Tool" in call for call in calls))
+
+    def test_submit_flush(self):
+        def fake_run(command, **kwargs):
+            if "Broken" in command:
+                raise RuntimeError("submit failed")
+            return "Pull request: https://github.com/microsoft/winget-pkgs/pull/777\n"
+        with mock.patch.object(_update_all, "run_with_stream", fake_run), mock.patch("sys.stdout", new=open(os.devnull, "w")):
+            # Already has an open PR, never queued
+            _update_all.submit_package("komac", "manifests\\n\\NirSoft\\Tool3\\1.3")
+            _update_all.submit_package("komac", "manifests\\n\\NirSoft\\Tool3\\1.4")
+            _update_all.submit_package("komac", "manifests\\n\\NirSoft\\Tool3\\1.4")
+            _update_all.submit_package("komac", "manifests\\b\\Broken\\Tool\\1.0")
+            self.assertEqual([folder for _, folder in _update_all.submit_q], ["manifests\\n\\NirSoft\\Tool3\\1.4", "manifests\\b\\Broken\\Tool\\1.0"])
+            failed = _update_all.submit_flush(jobs=2)
+            sys.stdout.close()
+        self.assertEqual(failed, ["manifests\\b\\Broken\\Tool\\1.0"])
+        self.assertEqual(_update_all.submit_q, [])
+        # The new PR counts as open for the rest of the run
+        self.assertEqual(_update_all.find_prs("manifests\\n\\NirSoft\\Tool3\\1.4"), [777])
+        self.assertEqual(len(SearchHandler.queries), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
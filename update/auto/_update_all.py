@@ -2,14 +2,77 @@ import re
 import os
 import sys
 import json
+import hashlib
 import shutil
-import requests
+import time
 import threading
-import subprocess
 import importlib.util
 from pathlib import Path
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "Tools"))
+import HttpClient
+import GitHubReleases
+import TestLinks
+import ManifestIndex
+import PeVersion
+import ManifestText
+import ProcessRunner
+
+PR_REPO = "microsoft/winget-pkgs"
+STATE_DIR = Path(__file__).resolve().parents[2] / "Tools" / ".cache" / "updaters"
 
 submit_q = []
+submit_lock = threading.Lock()
+_open_prs = False
+open_prs_lock = threading.Lock()
+releasenotes_lock = threading.Lock()
+git_lock = threading.Lock()
+_local = threading.local()
+
+class PrefixedStdout:
+    """Stdout proxy that tags each line with the prefix of the thread writing it"""
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        prefix = getattr(_local, "prefix", "")
+        if not prefix:
+            with self.lock:
+                return self.stream.write(text)
+        pending = getattr(_local, "pending", "") + text
+        *lines, _local.pending = pending.split("\n")
+        if lines:
+            with self.lock:
+                self.stream.write("".join(f"{prefix}{line}\n" for line in lines))
+                self.stream.flush()
+        return len(text)
+
+    def flush(self):
+        prefix = getattr(_local, "prefix", "")
+        if prefix and getattr(_local, "pending", ""):
+            with self.lock:
+                self.stream.write(f"{prefix}{_local.pending}\n")
+            _local.pending = ""
+        with self.lock:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+@contextmanager
+def prefixed_output(enabled=True):
+    """Swap in PrefixedStdout for the duration of a concurrent section"""
+    if not enabled or isinstance(sys.stdout, PrefixedStdout):
+        yield
+        return
+    sys.stdout = PrefixedStdout(sys.stdout)
+    try:
+        yield
+    finally:
+        sys.stdout = sys.stdout.stream
 
 def inject_context(target):
     target.update({
@@ -18,51 +81,27 @@ def inject_context(target):
         if not k.startswith("__")
     })
 
-def run_with_stream(*args, **kwargs):
-    def pump(stream, collect=False):
-        for line in stream:
-            print(line, end="")
-            if collect:
-                output.append(line)
-    output = []
-    proc = subprocess.Popen(
-        *args,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        shell=True,
-        **kwargs,
-    )
-    t1 = threading.Thread(target=pump, args=(proc.stdout, True))
-    t2 = threading.Thread(target=pump, args=(proc.stderr, False))
-    t1.start()
-    t2.start()
-    t1.join()
-    t2.join()
-    proc.wait()
-    if proc.returncode:
-        raise subprocess.CalledProcessError(proc.returncode, proc.args)
-    return "".join(output)
-
-def check_mismatches(package_folder):
-    check_output = run_with_stream(
-        f"\"{sys.executable}\" -u Tools\\TestLinks.py {package_folder}\\*.installer.*",
-    )
-    
+def run_with_stream(command, **kwargs):
+    """Run command echoing its output, returns its stdout; see ProcessRunner.run_async for the options"""
+    return ProcessRunner.run(command, **kwargs)
+
+def check_mismatches(package_folder, store=False):
     files = []
     urls = []
     packages = []
     seen = set()
     
-    blocks = check_output.strip().split("\n\n")
-    for block in blocks:
-        if "Installer hash mismatch!" not in block:
+    # store keeps downloaded installers around for updaters that inspect them next (PeVersion)
+    for file_path, result in TestLinks.check_links([f"{package_folder}\\*.installer.*"], store=store):
+        TestLinks.print_result(file_path, result)
+        record = TestLinks.to_record(file_path, result)
+        if record["match"] is not False:
             continue
         
-        file = re.search(r"^File:\s+(\S+)$", block, re.MULTILINE).group(1)
-        url = re.search(r"^URL:\s+(\S+)$", block, re.MULTILINE).group(1)
+        file = record["file"]
+        url = record["url"]
         
-        package = file.rsplit("\\", 1)[1].replace(".installer.yaml", "")
+        package = Path(file).name.replace(".installer.yaml", "")
         if package in seen:
             continue
 
@@ -73,13 +112,64 @@ def check_mismatches(package_folder):
     
     return files, urls, packages
 
-def check_releases(url):
-    releases = requests.get(url, params={"per_page": 100}, timeout=10).json()
-    return [
-        release["tag_name"].removeprefix("v")
-        for release in releases
-        if not release["draft"] and not release["prerelease"]
-    ]
+def check_releases(url, known=(), wanted=None):
+    """Published releases of a GitHub releases API url as {version, tag, assets} dicts, newest first"""
+    return GitHubReleases.releases(url, known, wanted)
+
+class UpdaterState:
+    """Last upstream fingerprint an updater ran to completion with, kept in Tools/.cache/updaters/<name>.json"""
+    def __init__(self, name, *parts):
+        self.path = STATE_DIR / f"{name}.json"
+        # Version folders this run queued for submission, and whether something was left for a later run
+        self.folders = []
+        self.pending = False
+        # A part we could not determine makes the fingerprint unknown, so the updater always runs
+        self.fingerprint = None if any(part is None for part in parts) else hashlib.sha256(
+            json.dumps(parts, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def unchanged(self):
+        if self.fingerprint is None or os.getenv("UPDATE_FORCE", "0").lower() in ("true", "1"):
+            return False
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))["fingerprint"] == self.fingerprint
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def save(self, failed=()):
+        """Record the fingerprint, unless work is pending or a submission of this updater is among failed"""
+        failed = {str(folder) for folder in failed}
+        if self.fingerprint is None or self.pending or any(str(folder) in failed for folder in self.folders):
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({"fingerprint": self.fingerprint, "saved": time.time()}), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+def head_fingerprint(urls, jobs=8):
+    """Status and ETag/Last-Modified/Content-Length of every url
+
+    None unless every url answered 2xx with a strong ETag or a Last-Modified and Content-Length,
+    anything less can't tell a changed installer apart and must not let the updater be skipped.
+    """
+    def validators(url):
+        try:
+            resp = HttpClient.head(url, allow_redirects=True, timeout=10)
+        except Exception:
+            return None
+        etag = resp.headers.get("ETag")
+        last_modified = resp.headers.get("Last-Modified")
+        length = resp.headers.get("Content-Length")
+        if not resp.ok or not ((etag and not etag.startswith("W/")) or (last_modified and length)):
+            return None
+        return url, resp.status_code, etag, last_modified, length
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        result = list(pool.map(validators, urls))
+    return None if not result or None in result else result
+
+def manifest_fingerprint(folder):
+    """Installer URLs and hashes currently in folder, as recorded by the manifest index"""
+    return sorted((row["url"] or "", row["sha256"] or "") for row in ManifestIndex.installers(folder))
 
 def update_package_local(updater, package_folder, batch_args, replace_folder=""):
     run_with_stream(
@@ -87,57 +177,242 @@ def update_package_local(updater, package_folder, batch_args, replace_folder="")
     )
     if replace_folder:
         shutil.rmtree(replace_folder)
-    run_with_stream(
-        f"git add {package_folder} && git --no-pager diff HEAD {package_folder}"
-    )
+    # Updaters running side by side would otherwise race for .git/index.lock
+    with git_lock:
+        run_with_stream(
+            f"git add {package_folder} && git --no-pager diff HEAD {package_folder}"
+        )
+
+def update_from_release(package_folder, new_version, release):
+    """Write new_version's manifests from the newest existing ones and GitHub's release metadata
+
+    Hashes come from the published asset digests or checksum file, so nothing is downloaded.
+    Returns False, leaving the tree untouched, when any installer has no published hash.
+    """
+    existing = sorted(ManifestIndex.versions(package_folder), key=lambda version: [int(i) for i in re.findall(r"\d+", version)])
+    if not existing:
+        return False
+    old_version = existing[-1]
+    template = Path(package_folder) / old_version
+    hashes = GitHubReleases.asset_hashes(release)
+    manifests = {}
+    for path in sorted(template.glob("*.yaml")):
+        text = ManifestText.drop_tool_header(ManifestText.read(path))
+        text = ManifestText.set_scalar(text, "PackageVersion", ManifestText.get_scalar(text, "PackageVersion").replace(old_version, new_version))
+        if ManifestText.get_scalar(text, "ManifestType") == "installer":
+            new_hashes = {}
+            for url in re.findall(r"^[ -]*InstallerUrl:[ \t]*(\S+)", text, re.MULTILINE):
+                new_url = url.replace(old_version, new_version)
+                name = new_url.rsplit("/", 1)[-1]
+                if name not in hashes:
+                    print(f"No published hash for {name}, falling back to {package_folder} updater")
+                    return False
+                new_hashes[new_url] = hashes[name]
+                text = text.replace(f"InstallerUrl: {url}", f"InstallerUrl: {new_url}")
+            text, _ = ManifestText.set_installer_hashes(text, new_hashes)
+            if release.get("published") and ManifestText.get_scalar(text, "ReleaseDate"):
+                text = ManifestText.set_scalar(text, "ReleaseDate", release["published"][:10])
+        if ManifestText.get_scalar(text, "ManifestType") == "defaultLocale":
+            if release.get("html_url") and ManifestText.get_scalar(text, "ReleaseNotesUrl"):
+                text = ManifestText.set_scalar(text, "ReleaseNotesUrl", release["html_url"])
+            notes = GitHubReleases.release_notes(release)
+            # No notes for this release means none at all, not the previous version's
+            text = ManifestText.set_block(text, "ReleaseNotes", notes) if notes else ManifestText.drop_block(text, "ReleaseNotes")
+            data = ManifestText.load(text)
+            if not isinstance(data, dict) or data.get("ReleaseNotes") != ("\n".join(notes) if notes else None):
+                print(f"Release notes did not read back from {path.name}, falling back to {package_folder} updater")
+                return False
+        if ManifestText.get_scalar(text, "ManifestType") == "locale":
+            # Translated notes of the previous version would be stale just the same
+            text = ManifestText.drop_block(text, "ReleaseNotes")
+        manifests[path.name] = text
+    
+    new_version_folder = Path(package_folder) / new_version
+    new_version_folder.mkdir(parents=True, exist_ok=True)
+    for name, text in manifests.items():
+        ManifestText.write(new_version_folder / name, text)
+    with git_lock:
+        run_with_stream(
+            f"git add {package_folder} && git --no-pager diff HEAD {package_folder}"
+        )
+    return True
 
 def update_and_replace(updater, package_folder, batch_args, replace):
     return update_package_local(updater, package_folder, batch_args, replace)
 
-def submit_package(tool, version_folder, options=""):
+def version_key(version_folder):
+    """(PackageIdentifier, version) of a manifests\\<letter>\\<publisher>\\...\\<version> folder"""
+    parts = re.split(r"[\\/]", str(version_folder))
+    if len(parts) < 5 or parts[0] != "manifests":
+        raise ValueError(f"Invalid path: {version_folder}")
+    return ".".join(parts[2:-1]), parts[-1]
+
+def fetch_open_prs():
+    """Every open winget-pkgs PR of the authenticated user, as {(package, version): [numbers]}"""
+    api = os.getenv("GITHUB_API_URL", "https://api.github.com")
+    query = f"repo:{PR_REPO} is:pr is:open author:{os.getenv("PR_AUTHOR", "@me")}"
+    url = f"{api}/search/issues"
+    params = {"q": query, "per_page": 100}
+    found = {}
+    while url:
+        resp = HttpClient.get(url, params=params, headers=GitHubReleases.headers(), timeout=10)
+        resp.raise_for_status()
+        for item in resp.json()["items"]:
+            match = re.search(r"(\S+) version (\S+)", item["title"])
+            if match:
+                found.setdefault(match.groups(), []).append(item["number"])
+        url = resp.links.get("next", {}).get("url")
+        params = None
+    return found
+
+def open_prs():
+    """Open PRs looked up once per run, None if the search API could not be used"""
+    global _open_prs
+    with open_prs_lock:
+        if _open_prs is False:
+            try:
+                _open_prs = fetch_open_prs()
+            except Exception as e:
+                print(f"Open PR lookup failed, falling back to GitHubPRSearch.ps1: {type(e).__name__}: {e}")
+                _open_prs = None
+        return _open_prs
+
+def find_prs(version_folder):
+    prs = open_prs()
+    if prs is None:
+        return [i["number"] for i in json.loads(run_with_stream(
+            f"powershell -ExecutionPolicy Bypass -File Tools\\GitHubPRSearch.ps1 {version_folder}"
+        ))]
+    with open_prs_lock:
+        return prs.get(version_key(version_folder), [])
+
+def submit_package(tool, version_folder, options="", state=None):
     if tool == "wingetcreate":
         command = "wingetcreate submit --no-open"
     elif tool == "komac":
         command = "komac submit --submit"
     
-    found_pr = json.loads(run_with_stream(
-        f"powershell -ExecutionPolicy Bypass -File Tools\\GitHubPRSearch.ps1 {version_folder}"
-    ))
+    found_pr = find_prs(version_folder)
     
     if found_pr:
-        print(f"{"::warning title=Duplicate PR::" if os.getenv("GITHUB_ACTIONS") else ""}{version_folder} found in already opened PR(s): {", ".join(str(i["number"]) for i in found_pr)}")
-    else:
-        submit_q.append((f"{command} {version_folder} {options}", version_folder))
+        print(f"{"::warning title=Duplicate PR::" if os.getenv("GITHUB_ACTIONS") else ""}{version_folder} found in already opened PR(s): {", ".join(str(i) for i in found_pr)}")
+        return
+    with submit_lock:
+        if all(queued != version_folder for _, queued in submit_q):
+            submit_q.append((f"{command} {version_folder} {options}", version_folder))
+    if state is not None:
+        state.folders.append(version_folder)
 
-def submit_flush():
-    for command, version_folder in submit_q:
-        try:
-            print(f"Submitting {version_folder}...")
-            submit_output = run_with_stream(
-                f"{command}"
-            )
-            pr_url = re.search(r"https://github\.com/microsoft/winget-pkgs/pull/\d+", submit_output).group(0)
-            run_with_stream(
-                f"powershell -ExecutionPolicy Bypass -File Tools\\UpdatePRBody.ps1 Tools\\PRBodyTemplate\\PRBodyModify.md -pr {pr_url.split('/')[-1]}"
-            )
-        except Exception as e:
-            print(f"{"::error title=Failed submission::" if os.getenv("GITHUB_ACTIONS") else ""}Failed to submit {version_folder}: {type(e).__name__}: {e}")
-    submit_q.clear()
+def submit_one(command, version_folder):
+    """Submit one queued package and point its PR body at our template, returns the error if it failed"""
+    try:
+        if isinstance(sys.stdout, PrefixedStdout):
+            _local.prefix = f"[{" ".join(version_key(version_folder))}] "
+        print(f"Submitting {version_folder}...")
+        submit_output = run_with_stream(
+            f"{command}"
+        )
+        pr_url = re.search(r"https://github\.com/microsoft/winget-pkgs/pull/\d+", submit_output).group(0)
+        run_with_stream(
+            f"powershell -ExecutionPolicy Bypass -File Tools\\UpdatePRBody.ps1 Tools\\PRBodyTemplate\\PRBodyModify.md -pr {pr_url.split('/')[-1]}"
+        )
+        prs = open_prs()
+        if prs is not None:
+            with open_prs_lock:
+                prs.setdefault(version_key(version_folder), []).append(int(pr_url.split("/")[-1]))
+        return None
+    except Exception as e:
+        print(f"{"::error title=Failed submission::" if os.getenv("GITHUB_ACTIONS") else ""}Failed to submit {version_folder}: {type(e).__name__}: {e}")
+        return e
+    finally:
+        sys.stdout.flush()
+        _local.prefix = ""
+
+def submit_flush(jobs=None):
+    with submit_lock:
+        queued = submit_q[:]
+        submit_q.clear()
+    if not queued:
+        return []
+    jobs = max(1, min(jobs or int(os.getenv("SUBMIT_JOBS", "3")), len(queued)))
+    with prefixed_output(jobs > 1):
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            errors = list(pool.map(lambda item: submit_one(*item), queued))
+    failed = [version_folder for (_, version_folder), error in zip(queued, errors) if error is not None]
+    if failed:
+        print(f"{len(failed)} of {len(queued)} submission(s) failed: {", ".join(str(i) for i in failed)}")
+    return failed
 
 def sync_manifests():
     run_with_stream(
         f"powershell -ExecutionPolicy Bypass -File Tools\\SyncManifests.ps1"
     )
 
+def load_releasenotes(name):
+    """Import update\\releasenotes\\releasenotes_<name>.py as a module, once per run"""
+    module_name = f"releasenotes_{name}"
+    with releasenotes_lock:
+        if module_name not in sys.modules:
+            path = Path(__file__).resolve().parents[1] / "releasenotes" / f"{module_name}.py"
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            sys.modules[module_name] = module
+        return sys.modules[module_name]
 
-if __name__ == "__main__":
-    for path in Path(__file__).parent.glob("auto_*.py"):
-        if path.stem == Path(__file__).stem:
-            continue
+def run_updater(path):
+    """Load and run one auto_*.py updater, returning its name, outcome, duration and UpdaterState"""
+    name = path.stem.removeprefix("auto_").removesuffix("_update")
+    _local.prefix = f"[{name}] "
+    start = time.perf_counter()
+    try:
         spec = importlib.util.spec_from_file_location(path.stem, path)
         module = importlib.util.module_from_spec(spec)
         inject_context(module.__dict__)
         spec.loader.exec_module(module)
-        module.run()
-    submit_flush()
+        state = module.run()
+        error = None
+    except Exception as e:
+        state = None
+        error = f"{type(e).__name__}: {e}"
+        print(f"{"::error title=Failed updater::" if os.getenv("GITHUB_ACTIONS") else ""}{name} failed: {error}")
+    finally:
+        sys.stdout.flush()
+        _local.prefix = ""
+    return name, error, time.perf_counter() - start, state
+
+def run_updaters(paths, jobs):
+    """Run the updaters side by side on jobs threads, they only share submit_q and the git index"""
+    with prefixed_output(jobs > 1):
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(run_updater, paths))
+    print("Updater summary:")
+    for name, error, elapsed, _ in results:
+        print(f"  {name:<20} {elapsed:8.1f}s  {"ok" if error is None else f"error ({error})"}")
+    return results
+
+
+if __name__ == "__main__":
+    if "--force" in sys.argv:
+        sys.argv.remove("--force")
+        os.environ["UPDATE_FORCE"] = str(True)
+    
+    if "--jobs" in sys.argv:
+        i = sys.argv.index("--jobs")
+        os.environ["UPDATE_JOBS"] = sys.argv[i + 1]
+        del sys.argv[i:i+2]
+    
+    paths = [
+        path
+        for path in sorted(Path(__file__).parent.glob("auto_*.py"))
+        if path.stem != Path(__file__).stem
+    ]
+    results = run_updaters(paths, max(1, int(os.getenv("UPDATE_JOBS", "4"))))
+    # Only now are the submissions done, a failed one leaves its updater to retry next run
+    failed = submit_flush()
+    for _, _, _, state in results:
+        if state is not None:
+            state.save(failed)
     sync_manifests()
+    if any(error is not None for _, error, _, _ in results):
+        sys.exit(1)
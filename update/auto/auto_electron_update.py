@@ -1,40 +1,47 @@
 def run(*, is_main=(__name__ == "__main__")):
     selfname = Path(__file__).stem.lstrip("_").removeprefix("auto_")
-    versions = check_releases("https://api.github.com/repos/electron/electron/releases")
     electron_dir = Path("manifests\\o\\OpenJS\\Electron")
     tracked_majors = {
         folder.name
         for folder in electron_dir.iterdir()
         if folder.is_dir()
     }
-    existing = {
-        folder.name
-        for major in electron_dir.iterdir()
-        if major.is_dir()
-        for folder in major.iterdir()
-        if folder.is_dir()
-    }
+    existing = ManifestIndex.versions(electron_dir)
+    releases_url = "https://api.github.com/repos/electron/electron/releases"
+    state = UpdaterState(selfname, GitHubReleases.etag(releases_url), sorted(existing))
+    if state.unchanged():
+        print("Upstream unchanged since last run, skipping")
+        return
+    releases = check_releases(
+        releases_url,
+        known=existing,
+        wanted=lambda version: version.split(".", 1)[0] in tracked_majors
+    )
     new_versions = [
-        version
-        for version in versions
-        if version not in existing
-        and version.split(".", 1)[0] in tracked_majors
+        release["version"]
+        for release in releases
+        if release["version"] not in existing
+        and release["version"].split(".", 1)[0] in tracked_majors
     ]
     print(new_versions)
+    release_by_version = {release["version"]: release for release in releases}
     
     for new_version in new_versions:
         updater = selfname
         package_folder = electron_dir / new_version.split(".", 1)[0]
         new_version_folder = package_folder / new_version
-        update_package_local(
-            updater,
-            package_folder,
-            f"{new_version}"
-        )
-        submit_package("komac", new_version_folder)
+        # Hashes from the release metadata when GitHub publishes them, komac downloads otherwise
+        if not update_from_release(package_folder, new_version, release_by_version[new_version]):
+            update_package_local(
+                updater,
+                package_folder,
+                f"{new_version}"
+            )
+        submit_package("komac", new_version_folder, state=state)
     
     if is_main:
-        submit_flush()
+        state.save(submit_flush())
+    return state
 
 
 if __name__ == "__main__":
@@ -1,6 +1,28 @@
 def run(*, is_main=(__name__ == "__main__")):
     selfname = Path(__file__).stem.lstrip("_").removeprefix("auto_")
-    files, urls, packages = check_mismatches("manifests\\n\\NirSoft")
+    package_dir = "manifests\\n\\NirSoft"
+    releasenotes = load_releasenotes(selfname)
+    # The zip often changes before its product page lists the new version, so the pages are part of the fingerprint
+    try:
+        product_urls = sorted({
+            releasenotes.package_url(package, quiet=True)
+            for package in Path(package_dir).iterdir()
+            if package.is_dir()
+        } - {None})
+        releasenotes.prefetch(product_urls)
+        latest_versions = [(url, releasenotes.latest_version(url)) for url in product_urls]
+    except Exception:
+        latest_versions = None
+    state = UpdaterState(
+        selfname,
+        head_fingerprint(ManifestIndex.installer_urls(package_dir)),
+        manifest_fingerprint(package_dir),
+        latest_versions
+    )
+    if state.unchanged():
+        print("Upstream unchanged since last run, skipping")
+        return
+    files, urls, packages = check_mismatches(package_dir)
     
     for i in range(len(urls) - 1, -1, -1):
         if not urls[i].endswith(".zip"):
@@ -12,20 +34,23 @@ def run(*, is_main=(__name__ == "__main__")):
     print(urls)
     print(packages)
     
+    page_urls = [releasenotes.package_url(Path(file).parent) for file in files]
+    releasenotes.prefetch(page_urls)
+    
     new_versions = []
-    for file in files:
+    for file, page_url in zip(files, page_urls):
         folder = Path(file).parent
-        check_output = run_with_stream(
-            f"\"{sys.executable}\" -u update\\releasenotes\\releasenotes_{selfname}.py {folder} --latest-version"
-        )
-        new_version = re.search(r"^Latest version:\s+(\S+)$", check_output, re.MULTILINE).group(1)
+        new_version = releasenotes.latest_version(page_url)
         print(f"{folder} => {new_version}")
         if folder.name == new_version:
             print("No new version")
+            # Installer changed but the page lags behind, look again next run
+            state.pending = True
             new_versions.append(None)
             continue
         new_versions.append(new_version)
     
+    new_version_folders = []
     for package_name, new_version, file in zip(packages, new_versions, files):
         if new_version is None:
             continue
@@ -39,13 +64,19 @@ def run(*, is_main=(__name__ == "__main__")):
             f"{package_name.split(".")[1]} {new_version}",
             replace=old_version_folder
         )
-        run_with_stream(
-            f"\"{sys.executable}\" -u update\\releasenotes\\releasenotes_{selfname}.py {new_version_folder} --no-backup"
-        )
-        submit_package("wingetcreate", new_version_folder, "--replace")
+        new_version_folders.append(new_version_folder)
+    
+    # One pass over all the new locale manifests, the product pages are already cached
+    failed = releasenotes.update_many(new_version_folders, backup=False)
+    for new_version_folder in new_version_folders:
+        if new_version_folder in failed:
+            state.pending = True
+            continue
+        submit_package("wingetcreate", new_version_folder, "--replace", state=state)
     
     if is_main:
-        submit_flush()
+        state.save(submit_flush())
+    return state
 
 
 if __name__ == "__main__":
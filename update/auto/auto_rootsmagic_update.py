@@ -1,6 +1,11 @@
 def run(*, is_main=(__name__ == "__main__")):
     selfname = Path(__file__).stem.lstrip("_").removeprefix("auto_")
-    files, urls, packages = check_mismatches("manifests\\r\\RootsMagic\\RootsMagic")
+    package_dir = "manifests\\r\\RootsMagic\\RootsMagic"
+    state = UpdaterState(selfname, head_fingerprint(ManifestIndex.installer_urls(package_dir)), manifest_fingerprint(package_dir))
+    if state.unchanged():
+        print("Upstream unchanged since last run, skipping")
+        return
+    files, urls, packages = check_mismatches(package_dir, store=True)
     
     for i in range(len(urls) - 1, -1, -1):
         if not urls[i].endswith(".exe"):
@@ -14,10 +19,9 @@ def run(*, is_main=(__name__ == "__main__")):
     
     new_versions = []
     for url in urls:
-        new_version_check_output = run_with_stream(
-            f"powershell -ExecutionPolicy Bypass -File Tools\\InstallerUrlChecker.ps1 {url}"
-        )
-        new_product_version = re.search(r"^ProductVersion:\s*(\S+)\s*$", new_version_check_output, re.MULTILINE).group(1)
+        # Read from the copy check_mismatches stored, or from the headers and resources only
+        new_product_version = PeVersion.product_version(url)
+        print(f"{url} => {new_product_version}")
         new_versions.append(new_product_version)
     print(new_versions)
     
@@ -32,10 +36,11 @@ def run(*, is_main=(__name__ == "__main__")):
             f"{new_version}",
             replace=old_version_folder
         )
-        submit_package("wingetcreate", new_version_folder, "--replace")
+        submit_package("wingetcreate", new_version_folder, "--replace", state=state)
     
     if is_main:
-        submit_flush()
+        state.save(submit_flush())
+    return state
 
 if __name__ == "__main__":
     from _update_all import inject_context
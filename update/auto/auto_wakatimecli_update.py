@@ -1,32 +1,40 @@
 def run(*, is_main=(__name__ == "__main__")):
     selfname = Path(__file__).stem.lstrip("_").removeprefix("auto_")
-    versions = check_releases("https://api.github.com/repos/wakatime/wakatime-cli/releases")
     wakatime_dir = Path("manifests\\w\\Wakatime\\CLIWakatime")
-    existing = {
-        folder.name
-        for folder in wakatime_dir.iterdir()
-        if folder.is_dir()
-    }
+    existing = ManifestIndex.versions(wakatime_dir)
+    releases_url = "https://api.github.com/repos/wakatime/wakatime-cli/releases"
+    state = UpdaterState(selfname, GitHubReleases.etag(releases_url), sorted(existing))
+    if state.unchanged():
+        print("Upstream unchanged since last run, skipping")
+        return
+    releases = check_releases(
+        releases_url,
+        known=existing
+    )
     new_versions = [
-        version
-        for version in versions
-        if version not in existing
+        release["version"]
+        for release in releases
+        if release["version"] not in existing
     ]
     print(new_versions)
+    release_by_version = {release["version"]: release for release in releases}
     
     for new_version in new_versions:
         updater = selfname
         package_folder = wakatime_dir
         new_version_folder = package_folder / new_version
-        update_package_local(
-            updater,
-            package_folder,
-            f"{new_version}"
-        )
-        submit_package("komac", new_version_folder)
+        # Hashes from the release metadata when GitHub publishes them, komac downloads otherwise
+        if not update_from_release(package_folder, new_version, release_by_version[new_version]):
+            update_package_local(
+                updater,
+                package_folder,
+                f"{new_version}"
+            )
+        submit_package("komac", new_version_folder, state=state)
     
     if is_main:
-        submit_flush()
+        state.save(submit_flush())
+    return state
 
 
 if __name__ == "__main__":
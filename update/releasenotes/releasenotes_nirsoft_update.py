@@ -1,86 +1,215 @@
 import re
 import sys
+import yaml
 import shutil
-import requests
+import threading
 from pathlib import Path
-from bs4 import BeautifulSoup
-from ruamel.yaml import YAML
-
-target = Path(sys.argv[1])
-yaml = YAML(typ='rt')
-
-if (target.is_file() and target.name.endswith(".locale.en-US.yaml")):
-    file_path = target
-elif target.is_dir():
-    file_path = next(target.rglob("*.locale.en-US.yaml"), None)
-else:
-    raise RuntimeError("Not a file")
-
-print(f"Loading {file_path.name}...")
-output = file_path.resolve()
-with open(output, "r", encoding="utf-8") as f:
-    data = yaml.load(f)
-    url = data.get("PackageUrl")
-    version = data.get("PackageVersion")
+from concurrent.futures import Future, ThreadPoolExecutor
+from lxml import html
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "Tools"))
+import HttpClient
+import ManifestText
+
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Start of the Versions History section and of whatever section follows it
+HISTORY_PATTERN = re.compile(r"<h4[^>]*utilsubject[^>]*>\s*Versions History\s*</h4>", re.IGNORECASE)
+SECTION_PATTERN = re.compile(r"<h4[\s>]", re.IGNORECASE)
+HISTORY_XPATH = "(//h4[contains(concat(' ', normalize-space(@class), ' '), ' utilsubject ')][normalize-space(.) = 'Versions History']/following::ul)[1]"
+
+# Parsed Versions History of every product page seen in this process, so the
+# version lookup and the notes extraction of a package share one fetch
+_histories = {}
+_histories_lock = threading.Lock()
+
+def locale_file(target):
+    target = Path(target)
+    if (target.is_file() and target.name.endswith(".locale.en-US.yaml")):
+        return target
+    elif target.is_dir():
+        return next(target.rglob("*.locale.en-US.yaml"), None)
+    else:
+        raise RuntimeError("Not a file")
+
+def load_locale(target, quiet=False):
+    """Read the en-US locale manifest of target, returns (path, text, data)"""
+    file_path = locale_file(target)
+    if not quiet:
+        print(f"Loading {file_path.name}...")
+    output = file_path.resolve()
+    text = ManifestText.read(output)
+    return output, text, yaml.load(text, Loader=YAML_LOADER) or {}
+
+def package_url(target, quiet=False):
+    return load_locale(target, quiet)[2].get("PackageUrl")
 
-print(f"Fetching {url}...")
-response = requests.get(url, timeout=30)
-response.raise_for_status()
-
-print(f"Parsing page...")
-soup = BeautifulSoup(response.text, "lxml")
-history_heading = soup.find(
-    "h4",
-    class_="utilsubject",
-    string=lambda text: text and text.strip() == "Versions History"
-)
-if history_heading is None:
-    raise RuntimeError("Versions History section was not found.")
-
-history = history_heading.find_next("ul")
-if history is None:
-    raise RuntimeError("Versions History list was not found.")
-
-if "--latest-version" in sys.argv:
-    latest_entry = history.find("li", recursive=False)
-    if latest_entry is None:
+def direct_text(element):
+    """Text nodes directly inside element, like BeautifulSoup's find_all(string=True, recursive=False)"""
+    return [text for text in [element.text] + [child.tail for child in element] if text is not None]
+
+def history_list(text):
+    """The Versions History <ul>, parsing only that section of the page when it can be located"""
+    start = HISTORY_PATTERN.search(text)
+    if start:
+        end = SECTION_PATTERN.search(text, start.end())
+        region = html.fromstring(f"<div>{text[start.start():end.start() if end else len(text)]}</div>")
+        found = region.xpath(HISTORY_XPATH)
+        if found:
+            return found[0]
+    # Unusual markup around the heading, fall back to the whole page
+    found = html.fromstring(text).xpath(HISTORY_XPATH)
+    if not found:
+        raise RuntimeError("Versions History section was not found.")
+    return found[0]
+
+def parse_history(text):
+    """Versions History of a product page as (version, notes) records, newest first; notes is None if missing"""
+    records = []
+    for entry in history_list(text).iterchildren("li"):
+        # The text directly inside the outer <li> is the version label.
+        label = next((text.strip() for text in direct_text(entry)), "")
+        notes = next(entry.iterchildren("ul"), None)
+        if notes is not None:
+            notes = [
+                re.sub(r"\s+", " ", " ".join(part.strip() for part in note.itertext() if part.strip()))
+                for note in notes.iterchildren("li")
+            ]
+        records.append((re.sub(r"^Version\s+", "", label).rstrip(":"), notes))
+    return records
+
+def load_history(url, quiet=False):
+    if not quiet:
+        print(f"Fetching {url}...")
+    response = HttpClient.get(url, timeout=30)
+    response.raise_for_status()
+
+    if not quiet:
+        print(f"Parsing page...")
+    return parse_history(response.text)
+
+def history(url, quiet=False):
+    """Versions History records of a product page, fetched and parsed once per process"""
+    with _histories_lock:
+        future = _histories.get(url)
+        owner = future is None
+        if owner:
+            future = _histories[url] = Future()
+    if owner:
+        try:
+            future.set_result(load_history(url, quiet))
+        except Exception as e:
+            future.set_exception(e)
+            with _histories_lock:
+                del _histories[url]
+    return future.result()
+
+def prefetch(urls, jobs=8):
+    """Fetch and parse product pages concurrently, failures surface again on the later lookup"""
+    urls = list(dict.fromkeys(urls))
+    print(f"Fetching {len(urls)} product page(s)...")
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for future in [pool.submit(history, url, True) for url in urls]:
+            future.exception()
+
+def latest_version(url):
+    records = history(url)
+    if not records:
         raise RuntimeError("No versions found.")
-    latest_label = next((text.strip() for text in latest_entry.find_all(string=True, recursive=False)), "")
-    new_version = re.sub(r"^Version\s+", "", latest_label).rstrip(":")
-    print(f"Latest version: {new_version}")
-    sys.exit()
-
-if "--no-backup" not in sys.argv:
-    print(f"Creating backup...")
-    shutil.copy2(output, output.with_name(output.name + ".rnbak"))
-
-target_version = f"Version {version}"
-for entry in history.find_all("li", recursive=False):
-    # The text directly inside the outer <li> is the version label.
-    label = next((text.strip() for text in entry.find_all(string=True, recursive=False)), "")
-    match = re.fullmatch(rf"{re.escape(target_version)}:?", label)
-    if not match:
-        continue
-    
-    notes = entry.find("ul", recursive=False)
-    if notes is None:
-        raise RuntimeError(f"No release notes found for {target_version}")
-    
-    print(f"Found release notes for version {version}:\n'{' '.join(str(notes or '').split())}'")
-    print(f"Deleting existing release notes...")
+    return records[0][0]
+
+def release_notes(url, version):
+    """Notes listed under version on the product page"""
+    target_version = f"Version {version}"
+    for entry_version, notes in history(url):
+        if entry_version != str(version):
+            continue
+
+        if notes is None:
+            raise RuntimeError(f"No release notes found for {target_version}")
+
+        print(f"Found release notes for version {version}:\n{notes}")
+        return notes
+    raise RuntimeError(f"{target_version} was not found.")
+
+def notes_block(version, notes):
+    return [f"- Version {version}:"] + [f"  - {note}" for note in notes]
+
+def splice_notes(text, data, version, notes):
+    """New text with the ReleaseNotes block replaced in place, None if the result doesn't read back as intended"""
+    lines = notes_block(version, notes)
+    new_text = ManifestText.set_block(text, "ReleaseNotes", lines)
+    try:
+        new_data = yaml.load(new_text, Loader=YAML_LOADER)
+    except yaml.YAMLError:
+        return None
+    # Everything but ReleaseNotes must read back unchanged
+    expected = {**data, "ReleaseNotes": "\n".join(lines)}
+    return new_text if new_data == expected else None
+
+def rewrite_notes(output, version, notes):
+    """Round-trip fallback through ruamel for manifests the text splice can't handle"""
+    from ruamel.yaml import YAML
+    rt = YAML(typ='rt')
+    with open(output, "r", encoding="utf-8") as f:
+        data = rt.load(f)
     data.pop("ReleaseNotes", None)
     with open(output, "w", encoding="utf-8") as f:
-        yaml.dump(data, f)
-    
-    print(f"Writing new release notes...")
+        rt.dump(data, f)
     with open(output, "a", encoding="utf-8") as f:
         f.write("ReleaseNotes: |-\n")
-        f.write(f"  - {target_version}:\n")
-        for note in notes.find_all("li", recursive=False):
-            text = re.sub(r"\s+", " ", note.get_text(" ", strip=True))
-            f.write(f"    - {text}\n")
+        for line in notes_block(version, notes):
+            f.write(f"  {line}\n")
+
+def update(target, backup=True):
+    """Replace the ReleaseNotes of target's locale manifest with the notes of its version"""
+    output, text, data = load_locale(target)
+    url = data.get("PackageUrl")
+    version = data.get("PackageVersion")
+    notes = release_notes(url, version)
+
+    if backup:
+        print(f"Creating backup...")
+        shutil.copy2(output, output.with_name(output.name + ".rnbak"))
+
+    print(f"Writing new release notes...")
+    new_text = splice_notes(text, data, version, notes)
+    if new_text is not None:
+        ManifestText.write(output, new_text)
+    else:
+        print(f"Unusual layout, rewriting the whole manifest...")
+        rewrite_notes(output, version, notes)
     print("Done.")
-    break
-else:
-    raise RuntimeError(f"{target_version} was not found.")
 
+def update_many(targets, backup=True, jobs=8):
+    """update() every target, fetching their product pages concurrently first; returns the targets that failed"""
+    targets = list(targets)
+    urls = []
+    for target in targets:
+        try:
+            urls.append(package_url(target))
+        except Exception:
+            pass
+    prefetch(urls, jobs)
+    failed = []
+    for target in targets:
+        try:
+            update(target, backup)
+        except Exception as e:
+            print(f"Failed to update {target}: {type(e).__name__}: {e}")
+            failed.append(target)
+    return failed
+
+
+if __name__ == "__main__":
+    backup = "--no-backup" not in sys.argv
+    latest = "--latest-version" in sys.argv
+    targets = [Path(arg) for arg in sys.argv[1:] if not arg.startswith("--")]
+    if latest:
+        for target in targets:
+            print(f"Latest version: {latest_version(package_url(target))}")
+        sys.exit()
+    if len(targets) == 1:
+        update(targets[0], backup)
+    elif update_many(targets, backup):
+        sys.exit(1)